@@ -3,16 +3,86 @@
 Email Sender Module - Handles SMTP email sending with HTML support and logging
 """
 
-import smtplib
-import ssl
+import functools
 import os
+import re
 import csv
 import time
 import random
+import threading
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+# smtplib, ssl and asyncio are imported where they are used, so importing this
+# module for statistics or validation stays cheap
+if TYPE_CHECKING:
+    from smtp_transport import SMTPPool
+
+# HTML-to-text and address validation patterns (EMAIL_RE is shared with lead_loader)
+# One scan handles every tag: group 1 = </p>, group 2 = <br>, anything else is dropped
+_HTML_TAG_RE = re.compile(r'(</p>)|(<br\s*/?>)|<[^>]+>')
+_HTML_TAG_REPLACEMENTS = ('', '\n\n', '\n')
+_WS_RE = re.compile(r'\n\s*\n\s*\n')
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+def _html_tag_replacement(match) -> str:
+    """Paragraph ends become a blank line, line breaks a newline, other tags vanish"""
+    return _HTML_TAG_REPLACEMENTS[match.lastindex or 0]
+
+@functools.lru_cache(maxsize=256)
+def _html_to_text_cached(html_body: str) -> str:
+    """HTML-to-text conversion, cached since repeated template bodies are common"""
+    # Convert paragraph/line-break tags and strip all other tags in one pass
+    text = _HTML_TAG_RE.sub(_html_tag_replacement, html_body)
+    
+    # Clean up extra whitespace
+    text = _WS_RE.sub('\n\n', text)
+    return text.strip()
+
+# Prebuilt multipart/alternative layout for all-ASCII messages; matches what
+# MIMEMultipart + MIMEText produce, without building the object tree per send
+_MIME_BOUNDARY = '=' * 15 + '%019d' % random.randrange(10 ** 19) + '=='
+_ASCII_MESSAGE_TEMPLATE = (
+    'Content-Type: multipart/alternative; boundary="%(boundary)s"\n'
+    'MIME-Version: 1.0\n'
+    'Subject: %(subject)s\n'
+    'From: %(from_addr)s\n'
+    'To: %(to_addr)s\n'
+    '\n'
+    '--%(boundary)s\n'
+    'Content-Type: text/plain; charset="us-ascii"\n'
+    'MIME-Version: 1.0\n'
+    'Content-Transfer-Encoding: 7bit\n'
+    '\n'
+    '%(text)s\n'
+    '--%(boundary)s\n'
+    'Content-Type: text/html; charset="us-ascii"\n'
+    'MIME-Version: 1.0\n'
+    'Content-Transfer-Encoding: 7bit\n'
+    '\n'
+    '%(html)s\n'
+    '--%(boundary)s--\n'
+)
+
+def _csv_escape(value) -> str:
+    """Quote a CSV field the way csv.writer's QUOTE_MINIMAL does"""
+    value = str(value)
+    if '"' in value or ',' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def _column_index(header: List[str], name: str) -> int:
+    """
+    Get a column's position in a CSV header
+    Missing columns map to one past the end, which callers pad with ''
+    """
+    try:
+        return header.index(name)
+    except ValueError:
+        return len(header)
 
 class EmailSender:
     def __init__(self, sent_log_file: str = 'sent_log.csv'):
@@ -22,11 +92,40 @@ class EmailSender:
         self.email_address = os.environ.get('EMAIL_ADDRESS')
         self.email_password = os.environ.get('EMAIL_PASSWORD')
         self.max_retries = 3
-        self.retry_delay = 5  # seconds
+        self.retry_delay = 5  # seconds, doubled after each failed attempt
+        self.retry_delay_cap = 30  # seconds
+        
+        # Persistent SMTP connection (opened lazily, reused across sends)
+        # Reconnect after this many messages so providers don't drop a long-lived session
+        self.max_msgs_per_connection = max(1, int(os.environ.get('MAX_MSGS_PER_CONN', '100')))
+        self.pool_size = int(os.environ.get('SMTP_POOL_SIZE', '5'))
+        self.keepalive_interval = 30  # seconds idle before a NOOP health check
+        # In-flight sends allowed by the async batch senders (the SMTP wire itself is serialized)
+        self.max_concurrent_sends = max(1, int(os.environ.get('MAX_CONCURRENT_SENDS', '1')))
+        self._conn = None
+        self._conn_mode = None
+        self._msg_count = 0
+        self._last_used = 0.0
+        self._ssl_ctx = None  # shared by every connection, built on first connect
+        self._session_depth = 0
+        self._log_lock = threading.Lock()
+        self._conn_lock = threading.RLock()  # one SMTP transaction at a time on self._conn
+        self._rng = random.Random()  # private PRNG for delays and backoff jitter
+        
+        # Buffered sent log writer (opened on first write)
+        self.log_flush_every = 32  # rows
+        self._log_fh = None
+        self._log_pending = 0
         
         # Initialize sent log file
         self._initialize_sent_log()
     
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def _initialize_sent_log(self):
         """Initialize the sent log CSV file with headers if it doesn't exist"""
         if not os.path.exists(self.sent_log_file):
@@ -60,63 +159,31 @@ class EmailSender:
             
         for attempt in range(self.max_retries):
             try:
-                # Create message
-                message = MIMEMultipart("alternative")
-                message["Subject"] = subject
-                message["From"] = self.email_address
-                message["To"] = to_email
-                
-                # Create both plain text and HTML versions
-                text_body = self._html_to_text(body)
-                html_body = body
+                message_text = self._build_message(to_email, subject, body)
                 
-                # Add both versions to message
-                text_part = MIMEText(text_body, "plain")
-                html_part = MIMEText(html_body, "html")
-                
-                message.attach(text_part)
-                message.attach(html_part)
-                
-                # Create secure SSL context and send
-                context = ssl.create_default_context()
-                
-                # Try STARTTLS first (port 587), then SSL (port 465)
-                if self.smtp_port == 587:
-                    # STARTTLS connection
-                    with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                        server.starttls(context=context)
-                        server.login(self.email_address, self.email_password)
-                        text = message.as_string()
-                        server.sendmail(self.email_address, to_email, text)
-                elif self.smtp_port == 465:
-                    # SSL connection
-                    with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                        server.login(self.email_address, self.email_password)
-                        text = message.as_string()
-                        server.sendmail(self.email_address, to_email, text)
-                else:
-                    # Fallback: try STARTTLS first, then SSL
-                    try:
-                        with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                            server.starttls(context=context)
-                            server.login(self.email_address, self.email_password)
-                            text = message.as_string()
-                            server.sendmail(self.email_address, to_email, text)
-                    except:
-                        with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                            server.login(self.email_address, self.email_password)
-                            text = message.as_string()
-                            server.sendmail(self.email_address, to_email, text)
+                # Send over the persistent connection (reconnects if needed)
+                self._deliver(to_email, message_text)
                 
                 # Log successful send
                 self._log_email(to_email, subject, 'sent', email_type, lead_data, template_index, followup_sequence)
                 return True
                 
             except Exception as e:
+                from smtp_transport import is_connection_error, is_transient_error
+                
                 print(f"⚠️ Attempt {attempt + 1} failed: {str(e)}")
+                if is_connection_error(e):
+                    # Connection is unusable - start fresh on the next attempt
+                    self._close_connection()
+                if not is_transient_error(e):
+                    # Permanent refusal (bad recipient, auth failure...) - retrying won't help
+                    print(f"❌ Failed to send email to {to_email}: permanent error")
+                    self._log_email(to_email, subject, 'failed', email_type, lead_data, template_index, followup_sequence)
+                    return False
                 if attempt < self.max_retries - 1:
-                    print(f"🔄 Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
+                    delay = self._backoff_delay(attempt)
+                    print(f"🔄 Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
                 else:
                     print(f"❌ Failed to send email to {to_email} after {self.max_retries} attempts")
                     self._log_email(to_email, subject, 'failed', email_type, lead_data, template_index, followup_sequence)
@@ -124,37 +191,365 @@ class EmailSender:
         
         return False
     
-    def _html_to_text(self, html_body: str) -> str:
+    def _backoff_delay(self, attempt: int) -> float:
         """
-        Convert HTML email body to plain text version
+        Seconds to wait before retrying a failed send: exponential backoff with jitter
         
         Args:
-            html_body (str): HTML formatted email body
+            attempt (int): Zero-based number of the attempt that just failed
             
         Returns:
-            str: Plain text version
+            float: Delay in seconds
+        """
+        return min(self.retry_delay_cap, self.retry_delay * (2 ** attempt)) + self._rng.uniform(0, 1)
+    
+    def _build_message(self, to_email: str, subject: str, body: str) -> str:
+        """
+        Build a multipart message with plain text and HTML versions
+        
+        Args:
+            to_email (str): Recipient email address
+            subject (str): Email subject
+            body (str): Email body (HTML format)
+            
+        Returns:
+            str: Formatted message ready for sendmail
+        """
+        text_body = self._html_to_text(body)
+        
+        fast = self._build_ascii_message(to_email, subject, text_body, body)
+        if fast is not None:
+            return fast
+        
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = self.email_address
+        message["To"] = to_email
+        
+        # Add both plain text and HTML versions to message
+        text_part = MIMEText(text_body, "plain")
+        html_part = MIMEText(body, "html")
+        
+        message.attach(text_part)
+        message.attach(html_part)
+        
+        return message.as_string()
+    
+    def _build_ascii_message(self, to_email: str, subject: str, text_body: str, html_body: str) -> Optional[str]:
+        """
+        Format an all-ASCII message straight from the prebuilt template
+        
+        Returns:
+            Optional[str]: Message text, or None when the MIME classes are needed
+            (non-ASCII content, headers that need folding, boundary clash)
+        """
+        headers = (subject, self.email_address, to_email)
+        if not all(value.isascii() and '\n' not in value and '\r' not in value for value in headers):
+            return None
+        if len(subject) > 60 or not (text_body.isascii() and html_body.isascii()):
+            return None
+        if _MIME_BOUNDARY in text_body or _MIME_BOUNDARY in html_body:
+            return None
+        
+        return _ASCII_MESSAGE_TEMPLATE % {
+            'boundary': _MIME_BOUNDARY,
+            'subject': subject,
+            'from_addr': self.email_address,
+            'to_addr': to_email,
+            'text': text_body,
+            'html': html_body,
+        }
+    
+    def send_many(self, jobs: List[tuple], max_workers: int = None) -> List[bool]:
+        """
+        Send many emails concurrently over a pool of persistent connections
+        
+        Args:
+            jobs (List[tuple]): Tuples of send_email arguments, e.g.
+                (to_email, subject, body, lead_data, email_type, template_index, followup_sequence)
+            max_workers (int): Number of parallel connections (defaults to pool_size)
+            
+        Returns:
+            List[bool]: Send result for each job, in the same order
         """
-        # Simple HTML to text conversion
-        text = html_body
+        if not self.email_address or not self.email_password:
+            print("❌ Email credentials not configured")
+            return [False] * len(jobs)
         
-        # Replace HTML paragraph tags with double newlines
-        text = text.replace('<p>', '')
-        text = text.replace('</p>', '\n\n')
+        from concurrent.futures import ThreadPoolExecutor
+        from smtp_transport import SMTPPool
         
-        # Replace HTML line breaks
-        text = text.replace('<br>', '\n')
-        text = text.replace('<br/>', '\n')
-        text = text.replace('<br />', '\n')
+        workers = max_workers or self.pool_size
+        pool = SMTPPool(self._connect, size=workers,
+                        max_msgs_per_connection=self.max_msgs_per_connection)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda job: self._send_pooled(pool, *job), jobs))
+        finally:
+            pool.close()
+    
+    async def send_email_async(self, *args, **kwargs) -> bool:
+        """send_email on a worker thread, so the event loop stays free while SMTP blocks"""
+        import asyncio
         
-        # Remove any remaining HTML tags
-        import re
-        text = re.sub(r'<[^>]+>', '', text)
+        return await asyncio.to_thread(self.send_email, *args, **kwargs)
+    
+    async def send_queue(self, jobs: Iterable[tuple], delay_type: str = 'cold', queue_size: int = 16) -> List[bool]:
+        """
+        Send emails one at a time with random delays, without blocking the event loop
+        A producer task pulls jobs into an asyncio.Queue while the consumer is
+        waiting out the delay, so lead parsing and template rendering done by a
+        job generator overlap the pauses instead of adding to them
         
-        # Clean up extra whitespace
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        text = text.strip()
+        Args:
+            jobs (Iterable[tuple]): Tuples of send_email arguments (may be a lazy generator)
+            delay_type (str): Delay profile between sends ('cold' or 'warmup')
+            queue_size (int): Maximum number of prepared jobs waiting to be sent
+            
+        Returns:
+            List[bool]: Send result for each job, in order
+        """
+        import asyncio
+        
+        pending = asyncio.Queue(maxsize=queue_size)
+        done = object()
+        
+        async def produce():
+            for job in jobs:
+                await pending.put(job)
+            await pending.put(done)
         
-        return text
+        producer = asyncio.create_task(produce())
+        results = []
+        try:
+            while True:
+                job = await pending.get()
+                if job is done:
+                    break
+                if results:
+                    await self.add_random_delay_async(delay_type)
+                results.append(await self.send_email_async(*job))
+            await producer
+        finally:
+            producer.cancel()
+            await asyncio.to_thread(self.flush_log)
+        return results
+    
+    def _send_pooled(self, pool: 'SMTPPool', to_email: str, subject: str, body: str, lead_data: Dict = None,
+                     email_type: str = 'cold', template_index: int = None, followup_sequence: int = None) -> bool:
+        """Send one email through the connection pool with exponential backoff on transient errors"""
+        for attempt in range(self.max_retries):
+            try:
+                message_text = self._build_message(to_email, subject, body)
+                with pool.connection() as server:
+                    server.sendmail(self.email_address, to_email, message_text)
+                
+                self._log_email(to_email, subject, 'sent', email_type, lead_data, template_index, followup_sequence)
+                return True
+                
+            except Exception as e:
+                from smtp_transport import is_transient_error
+                
+                if is_transient_error(e) and attempt < self.max_retries - 1:
+                    delay = self._backoff_delay(attempt)
+                    print(f"⚠️ Attempt {attempt + 1} to {to_email} failed: {str(e)} - retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+                    continue
+                
+                print(f"❌ Failed to send email to {to_email}: {str(e)}")
+                self._log_email(to_email, subject, 'failed', email_type, lead_data, template_index, followup_sequence)
+                return False
+        
+        return False
+    
+    def _connect(self):
+        """
+        Open and authenticate a new SMTP connection
+        Uses STARTTLS for port 587, SSL for port 465, and tries both otherwise
+        
+        Returns:
+            smtplib.SMTP: Logged-in SMTP connection
+        """
+        import ssl
+        
+        # Loading the trust store is costly - do it once and reuse the context
+        if self._ssl_ctx is None:
+            self._ssl_ctx = ssl.create_default_context()
+        context = self._ssl_ctx
+        
+        if self.smtp_port == 587:
+            server = self._open_starttls(context)
+            self._conn_mode = 'STARTTLS'
+        elif self.smtp_port == 465:
+            server = self._open_ssl(context)
+            self._conn_mode = 'SSL'
+        else:
+            # Fallback: try STARTTLS first, then SSL
+            try:
+                server = self._open_starttls(context)
+                self._conn_mode = 'STARTTLS fallback'
+            except Exception:
+                server = self._open_ssl(context)
+                self._conn_mode = 'SSL fallback'
+        
+        return server
+    
+    def _open_starttls(self, context):
+        """Open a STARTTLS connection and log in"""
+        from smtp_transport import PipelinedSMTP
+        
+        server = PipelinedSMTP(self.smtp_server, self.smtp_port)
+        try:
+            server.starttls(context=context)
+            server.login(self.email_address, self.email_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _open_ssl(self, context):
+        """Open an SSL connection and log in"""
+        from smtp_transport import PipelinedSMTP_SSL
+        
+        server = PipelinedSMTP_SSL(self.smtp_server, self.smtp_port, context=context)
+        try:
+            server.login(self.email_address, self.email_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _ensure_connection(self):
+        """
+        Get a live SMTP connection, opening a new one only when needed
+        The connection is rotated after max_msgs_per_connection messages and
+        checked with NOOP if it has been idle longer than keepalive_interval
+        
+        Returns:
+            smtplib.SMTP: Logged-in SMTP connection
+        """
+        import smtplib
+        
+        if self._conn is not None:
+            if self._msg_count >= self.max_msgs_per_connection:
+                self._close_connection()
+            elif time.monotonic() - self._last_used > self.keepalive_interval:
+                try:
+                    code, _ = self._conn.noop()
+                    if code != 250:
+                        self._close_connection()
+                except (smtplib.SMTPException, OSError):
+                    self._close_connection()
+        
+        if self._conn is None:
+            self._conn = self._connect()
+            self._msg_count = 0
+        
+        self._last_used = time.monotonic()
+        return self._conn
+    
+    def _deliver(self, to_email: str, message_text: str):
+        """
+        Send a prepared message over the persistent connection
+        Reconnects once if the server dropped the connection or replied with a
+        transient "service not available" code
+        
+        Args:
+            to_email (str): Recipient email address
+            message_text (str): Fully formatted message
+        """
+        import smtplib
+        from smtp_transport import RECONNECT_CODES
+        
+        with self._conn_lock:
+            server = self._ensure_connection()
+            try:
+                server.sendmail(self.email_address, to_email, message_text)
+            except smtplib.SMTPServerDisconnected:
+                self._close_connection()
+                server = self._ensure_connection()
+                server.sendmail(self.email_address, to_email, message_text)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code not in RECONNECT_CODES:
+                    raise
+                self._close_connection()
+                server = self._ensure_connection()
+                server.sendmail(self.email_address, to_email, message_text)
+        
+            self._msg_count += 1
+            self._last_used = time.monotonic()
+    
+    def open_session(self):
+        """
+        Open (or reuse) the persistent SMTP session
+        
+        Returns:
+            smtplib.SMTP: Logged-in SMTP connection
+        """
+        return self._ensure_connection()
+    
+    def close_session(self):
+        """Close the persistent SMTP session (QUIT) if one is open"""
+        self._close_connection()
+    
+    @contextmanager
+    def session(self):
+        """
+        Context manager that holds one SMTP session open across a batch of sends
+        The connection is opened on entry so the handshake happens once up front.
+        Sessions nest; the outermost one closes the connection on exit, but only
+        if it opened it (a connection already open beforehand is left alone)
+        
+        Yields:
+            EmailSender: This sender
+        """
+        owns_connection = self._session_depth == 0 and self._conn is None
+        self._session_depth += 1
+        try:
+            if self.email_address and self.email_password:
+                try:
+                    self.open_session()
+                except Exception as e:
+                    # send_email reconnects and retries on its own
+                    print(f"⚠️ Could not open SMTP session: {str(e)}")
+            yield self
+        finally:
+            self._session_depth -= 1
+            if owns_connection and self._session_depth == 0:
+                self.close_session()
+    
+    def close(self):
+        """Close the persistent SMTP connection and flush/close the sent log"""
+        self.close_session()
+        self._close_log()
+    
+    def _close_connection(self):
+        """Close the persistent SMTP connection if one is open"""
+        with self._conn_lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.quit()
+            except Exception:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+            finally:
+                self._conn = None
+                self._msg_count = 0
+    
+    def _html_to_text(self, html_body: str) -> str:
+        """
+        Convert HTML email body to plain text version
+        
+        Args:
+            html_body (str): HTML formatted email body
+            
+        Returns:
+            str: Plain text version
+        """
+        return _html_to_text_cached(html_body)
     
     def _log_email(self, to_email: str, subject: str, status: str, email_type: str, 
                    lead_data: Dict = None, template_index: int = None, followup_sequence: int = None):
@@ -171,8 +566,9 @@ class EmailSender:
             followup_sequence (int): Follow-up sequence number
         """
         try:
-            with open(self.sent_log_file, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
+            with self._log_lock:
+                if self._log_fh is None:
+                    self._log_fh = open(self.sent_log_file, 'a', newline='', encoding='utf-8', buffering=1 << 16)
                 
                 timestamp = datetime.now().isoformat()
                 first_name = lead_data.get('first_name', '') if lead_data else ''
@@ -187,57 +583,61 @@ class EmailSender:
                 else:
                     template_used = ''
                 
-                writer.writerow([
-                    timestamp, to_email, subject, status, email_type,
-                    first_name, last_name, organization, template_used, followup_sequence or ''
-                ])
+                # One pre-escaped line per row, same output as csv.writer
+                self._log_fh.write(
+                    f"{timestamp},{_csv_escape(to_email)},{_csv_escape(subject)},{status},{email_type},"
+                    f"{_csv_escape(first_name)},{_csv_escape(last_name)},{_csv_escape(organization)},"
+                    f"{template_used},{followup_sequence or ''}\r\n"
+                )
+                
+                self._log_pending += 1
+                if self._log_pending >= self.log_flush_every:
+                    self._flush_log_locked()
                 
         except Exception as e:
             print(f"⚠️ Warning: Could not log email: {str(e)}")
     
+    def flush_log(self):
+        """Write any buffered sent log rows to disk"""
+        with self._log_lock:
+            self._flush_log_locked()
+    
+    def _flush_log_locked(self):
+        if self._log_fh is not None and self._log_pending:
+            try:
+                self._log_fh.flush()
+            except Exception as e:
+                print(f"⚠️ Warning: Could not flush email log: {str(e)}")
+        self._log_pending = 0
+    
+    def _close_log(self):
+        """Flush and close the sent log file handle"""
+        with self._log_lock:
+            if self._log_fh is None:
+                return
+            self._flush_log_locked()
+            try:
+                self._log_fh.close()
+            except Exception:
+                pass
+            self._log_fh = None
+    
     def test_connection(self) -> bool:
         """
         Test SMTP connection without sending email
         Try both STARTTLS (587) and SSL (465) connection methods
+        The connection is kept open and reused by the next send
         
         Returns:
             bool: True if connection successful
         """
         try:
-            # First try STARTTLS (port 587)
-            if self.smtp_port == 587:
-                context = ssl.create_default_context()
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls(context=context)
-                    server.login(self.email_address, self.email_password)
-                    print("✅ SMTP connection test successful (STARTTLS)")
-                    return True
-            
-            # Try SSL connection (port 465)
-            elif self.smtp_port == 465:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                    server.login(self.email_address, self.email_password)
-                    print("✅ SMTP connection test successful (SSL)")
-                    return True
-            
-            # Fallback: try both methods
-            else:
-                # Try STARTTLS first
-                try:
-                    context = ssl.create_default_context()
-                    with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                        server.starttls(context=context)
-                        server.login(self.email_address, self.email_password)
-                        print("✅ SMTP connection test successful (STARTTLS fallback)")
-                        return True
-                except:
-                    # Try SSL
-                    context = ssl.create_default_context()
-                    with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                        server.login(self.email_address, self.email_password)
-                        print("✅ SMTP connection test successful (SSL fallback)")
-                        return True
+            self._close_connection()
+            self._conn = self._connect()
+            self._msg_count = 0
+            self._last_used = time.monotonic()
+            print(f"✅ SMTP connection test successful ({self._conn_mode})")
+            return True
                         
         except Exception as e:
             print(f"❌ SMTP connection test failed: {str(e)}")
@@ -253,6 +653,21 @@ class EmailSender:
         Returns:
             Dict: Statistics about sent emails
         """
+        return self.stats()['totals']
+    
+    def stats(self, date: str = None) -> Dict:
+        """
+        Get overall statistics and one day's send counts in a single pass over the log
+        
+        Args:
+            date (str): Date in YYYY-MM-DD format (defaults to today)
+            
+        Returns:
+            Dict: {'totals': get_send_statistics() result, 'daily': get_daily_send_count() result}
+        """
+        if not date:
+            date = datetime.now().strftime('%Y-%m-%d')
+        
         stats = {
             'total_sent': 0,
             'cold_emails': 0,
@@ -260,34 +675,58 @@ class EmailSender:
             'failed_emails': 0,
             'success_rate': 0.0
         }
+        counts = {'cold': 0, 'warmup': 0, 'total': 0}
+        result = {'totals': stats, 'daily': counts}
         
+        self.flush_log()
         if not os.path.exists(self.sent_log_file):
-            return stats
+            return result
             
         try:
-            with open(self.sent_log_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
+            with open(self.sent_log_file, 'r', encoding='utf-8-sig', newline='', buffering=1 << 20) as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if not header:
+                    return result
+                
+                i_status = _column_index(header, 'status')
+                i_type = _column_index(header, 'type')
+                i_ts = _column_index(header, 'timestamp')
+                width = max(i_status, i_type, i_ts) + 1
+                padding = [''] * width
                 
                 total_attempts = 0
+                total_sent = 0
+                warmup_sent = 0
                 for row in reader:
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        row = row + padding[len(row):]
                     total_attempts += 1
                     
-                    if row.get('status') == 'sent':
-                        stats['total_sent'] += 1
-                        if row.get('type') == 'warmup':
-                            stats['warmup_emails'] += 1
-                        else:
-                            stats['cold_emails'] += 1
-                    else:
-                        stats['failed_emails'] += 1
+                    if row[i_status] != 'sent':
+                        continue
+                    total_sent += 1
+                    email_type = row[i_type] or 'cold'
+                    if email_type == 'warmup':
+                        warmup_sent += 1
+                    
+                    if row[i_ts].startswith(date):
+                        counts[email_type] = counts.get(email_type, 0) + 1
+                        counts['total'] += 1
                 
+                stats['total_sent'] = total_sent
+                stats['warmup_emails'] = warmup_sent
+                stats['cold_emails'] = total_sent - warmup_sent
+                stats['failed_emails'] = total_attempts - total_sent
                 if total_attempts > 0:
-                    stats['success_rate'] = (stats['total_sent'] / total_attempts) * 100
+                    stats['success_rate'] = (total_sent / total_attempts) * 100
                     
         except Exception as e:
             print(f"⚠️ Warning: Could not read email statistics: {str(e)}")
             
-        return stats
+        return result
     
     def add_random_delay(self, delay_type: str = 'cold'):
         """
@@ -296,13 +735,55 @@ class EmailSender:
         Args:
             delay_type (str): Type of delay ('cold' or 'warmup')
         """
-        if delay_type == 'warmup':
-            delay = random.randint(60, 180)  # 1-3 minutes for warmup
-        else:
-            delay = random.randint(30, 120)  # 30 seconds to 2 minutes for cold emails
-            
+        delay = self._random_delay_seconds(delay_type)
         print(f"⏱️  Adding random delay: {delay} seconds...")
-        time.sleep(delay)
+        # Persist logged sends before going idle
+        self.flush_log()
+        
+        # Sleep in keepalive-sized chunks, NOOPing so the server doesn't drop the idle session
+        remaining = delay
+        while remaining > 0:
+            chunk = min(remaining, self.keepalive_interval)
+            time.sleep(chunk)
+            remaining -= chunk
+            if remaining > 0:
+                self._keepalive()
+    
+    async def add_random_delay_async(self, delay_type: str = 'cold'):
+        """Non-blocking add_random_delay; log flushes and keepalive NOOPs run in a worker thread"""
+        import asyncio
+        
+        delay = self._random_delay_seconds(delay_type)
+        print(f"⏱️  Adding random delay: {delay} seconds...")
+        await asyncio.to_thread(self.flush_log)
+        
+        remaining = delay
+        while remaining > 0:
+            chunk = min(remaining, self.keepalive_interval)
+            await asyncio.sleep(chunk)
+            remaining -= chunk
+            if remaining > 0:
+                await asyncio.to_thread(self._keepalive)
+    
+    def _keepalive(self):
+        """NOOP the idle persistent connection; drop it if the server has gone away"""
+        with self._conn_lock:
+            if self._conn is None:
+                return
+            try:
+                code, _ = self._conn.noop()
+            except Exception:
+                code = None
+            if code == 250:
+                self._last_used = time.monotonic()
+            else:
+                self._close_connection()
+    
+    def _random_delay_seconds(self, delay_type: str) -> int:
+        """Pick the pause length for a delay type"""
+        if delay_type == 'warmup':
+            return self._rng.randint(60, 180)  # 1-3 minutes for warmup
+        return self._rng.randint(30, 120)  # 30 seconds to 2 minutes for cold emails
     
     def validate_email_address(self, email: str) -> bool:
         """
@@ -314,9 +795,7 @@ class EmailSender:
         Returns:
             bool: True if email appears valid
         """
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(EMAIL_RE.match(email))
     
     def get_daily_send_count(self, date: str = None) -> Dict:
         """
@@ -328,25 +807,4 @@ class EmailSender:
         Returns:
             Dict: Send counts by type
         """
-        if not date:
-            date = datetime.now().strftime('%Y-%m-%d')
-            
-        counts = {'cold': 0, 'warmup': 0, 'total': 0}
-        
-        if not os.path.exists(self.sent_log_file):
-            return counts
-            
-        try:
-            with open(self.sent_log_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
-                    if row.get('status') == 'sent' and date in row.get('timestamp', ''):
-                        email_type = row.get('type', 'cold')
-                        counts[email_type] += 1
-                        counts['total'] += 1
-                        
-        except Exception as e:
-            print(f"⚠️ Warning: Could not read daily send count: {str(e)}")
-            
-        return counts 
\ No newline at end of file
+        return self.stats(date)['daily']
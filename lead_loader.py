@@ -4,15 +4,59 @@ Lead Loader Module - Handles CSV reading, cleaning, deduplication, and follow-up
 
 import csv
 import os
+import sys
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from operator import itemgetter
+from typing import AbstractSet, Any, Iterator, List, Dict, NamedTuple, Optional
+
+from email_sender import EMAIL_RE
+
+# Lead dict keys and the CSV column each is read from - updated mapping for new Apollo format
+LEAD_FIELDS = (
+    ('first_name', 'First Name'),
+    ('last_name', 'Last Name'),
+    ('email', 'Email'),
+    ('organization', 'Company'),  # Updated to use 'Company'
+    ('title', 'Title'),
+    ('city', 'City'),
+    ('state', 'State'),
+    ('country', 'Country'),
+    ('website', 'Website'),
+    ('industry', 'Industry'),
+)
+
+class Lead(NamedTuple):
+    """
+    Compact record for a validated lead (same fields, in LEAD_FIELDS order)
+    Parsed leads are cached in this form; callers get plain dicts via _asdict()
+    """
+    first_name: str
+    last_name: str
+    email: str
+    organization: str
+    title: str
+    city: str
+    state: str
+    country: str
+    website: str
+    industry: str
 
 class LeadLoader:
-    def __init__(self, csv_file: str, sent_log_file: str = 'sent_log.csv'):
+    def __init__(self, csv_file: str, sent_log_file: str = 'sent_log.csv', verbose: bool = False):
         self.csv_file = csv_file
         self.sent_log_file = sent_log_file
+        # Print a line for every skipped row instead of one summary
+        self.verbose = verbose
+        self._skip_counts = Counter()
+        self._row_notes = []  # verbose per-row messages, written out with the summary
+        # (mtime, sent addresses, history) from the last sent log read
+        self._log_cache = None
+        # ((path, mtime, size), leads, skip counts) from the last full CSV parse
+        self._leads_cache = None
         # Updated required columns for new Apollo format
         self.required_columns = ['First Name', 'Last Name', 'Email', 'Company', 'Title', 'City', 'State', 'Country']
+        self.optional_columns = ['Website', 'Industry']
         
         # Follow-up configuration
         self.followup_intervals = {
@@ -26,93 +70,239 @@ class LeadLoader:
         """Load and validate leads from CSV file"""
         if not os.path.exists(self.csv_file):
             raise FileNotFoundError(f"CSV file not found: {self.csv_file}")
-            
-        leads = []
+        
+        parsed, skip_counts, row_notes = self._parse_leads()
         sent_emails = self._load_sent_emails()
+        self._skip_counts = skip_counts.copy()
+        self._row_notes = list(row_notes)
+        
+        leads = []
+        for email, result in parsed:
+            lead = self._resolve_row(email, result, sent_emails)
+            if lead:
+                leads.append(lead._asdict())
+        
+        self._print_skip_summary()
+        print(f"✅ Loaded {len(leads)} new leads (excluding already contacted)")
+        return leads
+    
+    def _parse_leads(self):
+        """
+        Parse and validate every row of the CSV, without the sent-log filter
+        Cached until the file changes, so load_leads and load_followup_leads in
+        the same run share one parse. Each row with a valid email is kept with
+        its Lead (a fraction of the size of a dict) or the reason it fails
+        validation, so callers can drop contacted addresses before counting
+        other skips (see _resolve_row)
+        
+        Returns:
+            tuple: (List of (email, Lead or (reason, message)) rows, Counter of
+            rows skipped regardless of the sent log, List[str] of verbose row messages)
+        """
+        stat = os.stat(self.csv_file)
+        key = (self.csv_file, stat.st_mtime_ns, stat.st_size)
+        if self._leads_cache is None or self._leads_cache[0] != key:
+            rows = list(self._iter_csv_rows())
+            self._leads_cache = (key, rows, self._skip_counts.copy(), self._row_notes)
+        return self._leads_cache[1:]
+    
+    def iter_leads(self) -> Iterator[Dict]:
+        """
+        Yield validated, not-yet-contacted leads one at a time
+        Only the sent set is held in memory, so sending can start before the
+        whole CSV has been parsed. The skip summary prints once the CSV is exhausted
+        
+        Returns:
+            Iterator[Dict]: Lead dictionaries in file order
+        """
+        if not os.path.exists(self.csv_file):
+            raise FileNotFoundError(f"CSV file not found: {self.csv_file}")
+        
+        return (lead._asdict() for lead in self._iter_csv_leads(self._load_sent_emails()))
+    
+    def _iter_csv_leads(self, sent_emails: AbstractSet[str], summary: bool = True) -> Iterator[Lead]:
+        """Generator behind iter_leads (kept separate so iter_leads fails fast on a missing file)"""
+        for email, result in self._iter_csv_rows():
+            lead = self._resolve_row(email, result, sent_emails)
+            if lead:
+                yield lead
+        
+        if summary:
+            self._print_skip_summary()
+    
+    def _iter_csv_rows(self) -> Iterator[tuple]:
+        """Yield (email, Lead or (reason, message)) for each CSV row with a valid email"""
+        self._skip_counts = Counter()
+        self._row_notes = []
         
         try:
-            with open(self.csv_file, 'r', encoding='utf-8', newline='') as file:
-                # Try to detect if file has BOM
-                first_char = file.read(1)
-                if first_char != '\ufeff':
-                    file.seek(0)
-                
-                reader = csv.DictReader(file)
+            # utf-8-sig drops a leading BOM if there is one
+            with open(self.csv_file, 'r', encoding='utf-8-sig', newline='', buffering=1 << 20) as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
                 
                 # Validate required columns exist
-                if not reader.fieldnames:
+                if not header:
                     raise ValueError("CSV file appears to be empty or invalid")
                 
-                missing_columns = [col for col in self.required_columns if col not in reader.fieldnames]
+                missing_columns = [col for col in self.required_columns if col not in header]
                 if missing_columns:
-                    available_cols = ', '.join(reader.fieldnames) if reader.fieldnames else 'None'
+                    available_cols = ', '.join(header)
                     raise ValueError(f"Missing required columns in CSV: {', '.join(missing_columns)}. Available columns: {available_cols}")
                 
-                print(f"📋 Available columns: {','.join(reader.fieldnames)}")
+                print(f"📋 Available columns: {','.join(header)}")
                 
+                idx = self._column_indices(header)
                 for row_num, row in enumerate(reader, start=2):  # Start at 2 since row 1 is headers
+                    if not row:
+                        continue
                     try:
-                        lead = self._process_row(row, row_num)
-                        if lead and lead['email'].lower() not in sent_emails:
-                            leads.append(lead)
-                        elif lead:
-                            print(f"⏭️ Skipping {lead['email']} - already contacted")
+                        checked = self._process_row(row, row_num, idx)
                     except Exception as e:
-                        print(f"⚠️ Error processing row {row_num}: {e}")
+                        self._skip_row('errors', f"⚠️ Error processing row {row_num}: {e}")
                         continue
+                    
+                    if checked:
+                        yield checked
                         
         except Exception as e:
             raise Exception(f"Error reading CSV file: {e}")
+    
+    def _column_indices(self, header: List[str]) -> Dict[str, Any]:
+        """
+        Map each column used by _process_row to its position in the CSV header
+        Missing optional columns point one past the end, which _process_row pads with ''
+        
+        Args:
+            header (List[str]): CSV header row
             
-        print(f"✅ Loaded {len(leads)} new leads (excluding already contacted)")
-        return leads
+        Returns:
+            Dict[str, Any]: Column name to row index, plus '_width' (minimum row
+            length) and '_project' (picks the LEAD_FIELDS cells out of a row in one call)
+        """
+        # Later duplicates win, as with csv.DictReader
+        positions = {name: i for i, name in enumerate(header)}
+        idx = {col: positions.get(col, len(header)) for col in self.required_columns + self.optional_columns}
+        idx['_width'] = max(idx.values()) + 1
+        idx['_project'] = itemgetter(*(idx[column] for _, column in LEAD_FIELDS))
+        return idx
     
-    def _process_row(self, row: Dict, row_num: int) -> Optional[Dict]:
-        """Process and validate a single CSV row"""
+    def _process_row(self, row: List[str], row_num: int, idx: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Process and validate a single CSV row
+        
+        Returns:
+            Optional[tuple]: (email, Lead) for a valid row, (email, (reason, message))
+            for a row that fails a later check, None for an invalid email (counted here)
+        """
+        if len(row) < idx['_width']:
+            row = row + [''] * (idx['_width'] - len(row))
+        
+        # Pull out and clean just the lead columns; the Lead is only built for rows that pass
+        first_name, last_name, email, organization, *rest = map(str.strip, idx['_project'](row))
+        
         # Clean and validate email
-        email = str(row.get('Email', '')).strip().lower()
-        if not email or '@' not in email:
-            print(f"⚠️ Row {row_num}: Invalid or missing email")
+        email = email.lower()
+        if not EMAIL_RE.match(email):
+            self._skip_row('invalid_email', f"⚠️ Row {row_num}: Invalid or missing email")
             return None
-            
-        # Extract and clean data - updated mapping for new Apollo format
-        lead = {
-            'first_name': str(row.get('First Name', '')).strip(),
-            'last_name': str(row.get('Last Name', '')).strip(),
-            'email': email,
-            'organization': str(row.get('Company', '')).strip(),  # Updated to use 'Company'
-            'title': str(row.get('Title', '')).strip(),
-            'city': str(row.get('City', '')).strip(),
-            'state': str(row.get('State', '')).strip(),
-            'country': str(row.get('Country', '')).strip(),
-            'website': str(row.get('Website', '')).strip(),
-            'industry': str(row.get('Industry', '')).strip(),
-        }
         
         # Validate required fields
-        if not lead['first_name'] or not lead['last_name']:
-            print(f"⚠️ Row {row_num}: Missing first name or last name")
-            return None
+        if not first_name or not last_name:
+            return email, ('missing_name', f"⚠️ Row {row_num}: Missing first name or last name")
             
-        if not lead['organization']:
-            print(f"⚠️ Row {row_num}: Missing organization name")
+        if not organization:
+            return email, ('missing_organization', f"⚠️ Row {row_num}: Missing organization name")
+        
+        return email, Lead(first_name, last_name, email, organization, *rest)
+    
+    def _resolve_row(self, email: str, result, sent_emails: AbstractSet[str]) -> Optional[Lead]:
+        """
+        Turn a _process_row result into a Lead, counting the skip if there isn't one
+        Already-contacted addresses are dropped first, so a contacted row is always
+        counted as already contacted whatever else is wrong with it
+        """
+        if email in sent_emails:
+            self._skip_row('already_contacted', f"⏭️ Skipping {email} - already contacted")
             return None
-            
-        return lead
+        if isinstance(result, Lead):
+            return result
+        self._skip_row(*result)
+        return None
+    
+    def _skip_row(self, reason: str, message: str):
+        """Count a skipped row; in verbose mode keep its message for _print_skip_summary"""
+        self._skip_counts[reason] += 1
+        if self.verbose:
+            self._row_notes.append(message)
+    
+    def _print_skip_summary(self):
+        """Print the buffered verbose row messages, then one line summarising the skipped rows"""
+        if self._row_notes:
+            # One write for all row messages instead of a print per row
+            sys.stdout.write('\n'.join(self._row_notes) + '\n')
+            self._row_notes = []
+        labels = [
+            ('already_contacted', 'already contacted'),
+            ('invalid_email', 'invalid emails'),
+            ('missing_name', 'missing names'),
+            ('missing_organization', 'missing organizations'),
+            ('errors', 'unreadable rows'),
+        ]
+        parts = [f"{self._skip_counts[key]} {label}" for key, label in labels if self._skip_counts[key]]
+        if parts:
+            print(f"⏭️ Skipped {', '.join(parts)}")
     
-    def _load_sent_emails(self) -> set:
-        """Load previously sent email addresses from log file"""
+    def _load_sent_emails(self) -> AbstractSet[str]:
+        """Load previously sent email addresses (stripped, lowercased) from log file"""
+        return self._load_log()[0]
+    
+    def _load_log(self):
+        """
+        Read the sent log once for both the sent set and the follow-up history
+        The result is cached until the log file's mtime changes
+        
+        Returns:
+            tuple: (frozenset of sent addresses, history dict as from _get_email_history)
+        """
+        try:
+            mtime = os.stat(self.sent_log_file).st_mtime
+        except OSError:
+            return frozenset(), {}
+        if self._log_cache is not None and self._log_cache[0] == mtime:
+            return self._log_cache[1], self._log_cache[2]
+        
         sent_emails = set()
-        if os.path.exists(self.sent_log_file):
-            try:
-                with open(self.sent_log_file, 'r', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        if 'email' in row and row['email']:
-                            sent_emails.add(row['email'].lower())
-            except Exception as e:
-                print(f"⚠️ Warning: Could not load sent emails log: {e}")
-        return sent_emails
+        history = {}
+        try:
+            with open(self.sent_log_file, 'r', encoding='utf-8-sig', newline='', buffering=1 << 20) as file:
+                reader = csv.reader(file)
+                header = next(reader, None) or []
+                # Later duplicates win, as with csv.DictReader; missing columns read as ''
+                positions = {name: i for i, name in enumerate(header)}
+                i_email, i_status, i_ts, i_template = (
+                    positions.get(col, len(header)) for col in ('email', 'status', 'timestamp', 'template_used'))
+                i_type = positions.get('type')
+                width = len(header) + 1
+                
+                for row in reader:
+                    if len(row) < width:
+                        row = row + [''] * (width - len(row))
+                    email = row[i_email]
+                    if not email:
+                        continue
+                    email = email.strip().lower()
+                    sent_emails.add(email)
+                    
+                    if row[i_status] == 'sent':
+                        email_type = row[i_type] if i_type is not None else 'cold'
+                        self._add_history_row(history, email, row[i_ts], email_type, row[i_template])
+        except Exception as e:
+            print(f"⚠️ Warning: Could not read sent log: {e}")
+        
+        sent_emails = frozenset(sent_emails)
+        self._log_cache = (mtime, sent_emails, history)
+        return sent_emails, history
     
     def get_lead_count(self) -> int:
         """Get total number of leads in CSV (for progress tracking)"""
@@ -120,15 +310,16 @@ class LeadLoader:
             return 0
             
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                # Handle BOM
-                first_char = file.read(1)
-                if first_char != '\ufeff':
-                    file.seek(0)
-                
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                return sum(1 for row in reader)
+            # Count newlines in C over 1 MiB binary reads rather than tokenizing rows
+            lines = 0
+            last = b'\n'
+            with open(self.csv_file, 'rb', buffering=0) as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    lines += block.count(b'\n')
+                    last = block[-1:]
+            if last != b'\n':
+                lines += 1  # last row has no trailing newline
+            return max(0, lines - 1)  # Skip header
         except:
             return 0
     
@@ -150,17 +341,16 @@ class LeadLoader:
                 'with_titles': 0
             }
         
-        organizations = set()
-        countries = set()
-        with_titles = 0
-        
-        for lead in leads:
-            if lead.get('organization'):
-                organizations.add(lead['organization'])
-            if lead.get('country'):
-                countries.add(lead['country'])
-            if lead.get('title'):
-                with_titles += 1
+        # Work column by column so the loops run inside map/filter/set rather than bytecode
+        try:
+            organizations = set(filter(None, map(itemgetter('organization'), leads)))
+            countries = set(filter(None, map(itemgetter('country'), leads)))
+            with_titles = sum(map(bool, map(itemgetter('title'), leads)))
+        except KeyError:
+            # Hand-built lead dicts may leave fields out
+            organizations = set(filter(None, (lead.get('organization') for lead in leads)))
+            countries = set(filter(None, (lead.get('country') for lead in leads)))
+            with_titles = sum(1 for lead in leads if lead.get('title'))
         
         return {
             'total_leads': len(leads),
@@ -179,35 +369,16 @@ class LeadLoader:
         if not os.path.exists(self.csv_file):
             return []
         
-        # Get email history with timestamps and sequences
-        email_history = self._get_email_history()
+        # Work out which addresses are due from the history first, then pull
+        # only those leads from the CSV rather than checking every lead
+        due = self._due_followups(self._get_email_history(), datetime.now())
         
-        # Load all leads from CSV
-        all_leads = self._load_all_leads_from_csv()
+        followup_leads = self._load_all_leads_from_csv(only_emails=due)
+        for lead in followup_leads:
+            lead['followup_sequence'], lead['days_since_last'], lead['last_sent'] = due[lead['email']]
         
-        followup_leads = []
-        current_time = datetime.now()
-        
-        for lead in all_leads:
-            email = lead['email'].lower()
-            
-            if email in email_history:
-                history = email_history[email]
-                
-                # Determine next follow-up sequence
-                next_sequence = self._get_next_followup_sequence(history)
-                
-                if next_sequence and next_sequence <= self.max_followups:
-                    # Check if enough time has passed for this follow-up
-                    last_sent_time = history['last_sent']
-                    days_since_last = (current_time - last_sent_time).days
-                    required_days = self.followup_intervals.get(next_sequence, 7)
-                    
-                    if days_since_last >= required_days:
-                        lead['followup_sequence'] = next_sequence
-                        lead['days_since_last'] = days_since_last
-                        lead['last_sent'] = history['last_sent'].isoformat()
-                        followup_leads.append(lead)
+        # Longest-waiting leads first (ISO timestamps sort chronologically; ties keep CSV order)
+        followup_leads.sort(key=itemgetter('last_sent'))
         
         print(f"📋 Found {len(followup_leads)} leads ready for follow-up")
         return followup_leads
@@ -219,59 +390,76 @@ class LeadLoader:
         Returns:
             Dict: Email history with timestamps and sequence tracking
         """
-        history = {}
+        return self._load_log()[1]
+    
+    @staticmethod
+    def _add_history_row(history: Dict, email: str, timestamp_str: str, email_type: str, template_used: str):
+        """Fold one 'sent' log row into the per-address history"""
+        # Log timestamps are naive local time; drop a UTC suffix without building extra strings
+        if timestamp_str.endswith('Z'):
+            timestamp_str = timestamp_str[:-1]
+        elif timestamp_str.endswith('+00:00'):
+            timestamp_str = timestamp_str[:-6]
+        try:
+            timestamp = datetime.fromisoformat(timestamp_str)
+        except:
+            return
+        
+        if email not in history:
+            history[email] = {
+                'first_sent': timestamp,
+                'last_sent': timestamp,
+                'send_count': 0,
+                'cold_count': 0,
+                'followup_count': 0,
+                'max_sequence': None  # highest follow-up sequence seen, kept as rows are read
+            }
+        
+        history[email]['last_sent'] = max(history[email]['last_sent'], timestamp)
+        history[email]['send_count'] += 1
         
-        if not os.path.exists(self.sent_log_file):
-            return history
+        if email_type == 'cold':
+            history[email]['cold_count'] += 1
+        elif email_type == 'followup':
+            history[email]['followup_count'] += 1
             
-        try:
-            with open(self.sent_log_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
-                    if row.get('status') == 'sent' and row.get('email'):
-                        email = row['email'].lower()
-                        timestamp_str = row.get('timestamp', '')
-                        email_type = row.get('type', 'cold')
-                        
-                        try:
-                            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00').replace('+00:00', ''))
-                        except:
-                            continue
-                        
-                        if email not in history:
-                            history[email] = {
-                                'first_sent': timestamp,
-                                'last_sent': timestamp,
-                                'send_count': 0,
-                                'cold_count': 0,
-                                'followup_count': 0,
-                                'sequences': []
-                            }
-                        
-                        history[email]['last_sent'] = max(history[email]['last_sent'], timestamp)
-                        history[email]['send_count'] += 1
-                        
-                        if email_type == 'cold':
-                            history[email]['cold_count'] += 1
-                        elif email_type == 'followup':
-                            history[email]['followup_count'] += 1
-                            
-                        # Track sequence if it's a follow-up
-                        if 'followup' in email_type.lower():
-                            # Try to extract sequence number from template_used field
-                            template_used = row.get('template_used', '')
-                            if 'Follow-up' in template_used:
-                                try:
-                                    seq = int(template_used.split()[-1])
-                                    history[email]['sequences'].append(seq)
-                                except:
-                                    pass
-                        
-        except Exception as e:
-            print(f"⚠️ Warning: Could not read email history: {e}")
+        # Track sequence if it's a follow-up
+        if 'followup' in email_type.lower():
+            # Try to extract sequence number from template_used field
+            if 'Follow-up' in template_used:
+                try:
+                    seq = int(template_used.split()[-1])
+                    max_sequence = history[email]['max_sequence']
+                    if max_sequence is None or seq > max_sequence:
+                        history[email]['max_sequence'] = seq
+                except:
+                    pass
+    
+    def _due_followups(self, email_history: Dict, current_time: datetime) -> Dict[str, tuple]:
+        """
+        Find addresses whose next follow-up is due
+        
+        Args:
+            email_history (Dict): History from _get_email_history
+            current_time (datetime): Time to measure the follow-up intervals against
+            
+        Returns:
+            Dict[str, tuple]: Email to (next sequence, days since last send, last sent ISO timestamp)
+        """
+        due = {}
+        for email, history in email_history.items():
+            # Determine next follow-up sequence
+            next_sequence = self._get_next_followup_sequence(history)
             
-        return history
+            if next_sequence and next_sequence <= self.max_followups:
+                # Check if enough time has passed for this follow-up
+                last_sent_time = history['last_sent']
+                days_since_last = (current_time - last_sent_time).days
+                required_days = self.followup_intervals.get(next_sequence, 7)
+                
+                if days_since_last >= required_days:
+                    due[email] = (next_sequence, days_since_last, last_sent_time.isoformat())
+        return due
     
     def _get_next_followup_sequence(self, history: Dict) -> Optional[int]:
         """
@@ -287,39 +475,28 @@ class LeadLoader:
         if history['followup_count'] == 0:
             return 1
         
-        # Find the highest follow-up sequence sent
-        sequences = history.get('sequences', [])
-        if not sequences:
+        # Highest follow-up sequence sent, tracked while reading the log
+        max_sequence = history.get('max_sequence')
+        if max_sequence is None:
             # Fallback: use followup_count
             return min(history['followup_count'] + 1, self.max_followups + 1)
         
-        max_sequence = max(sequences)
         next_sequence = max_sequence + 1
         
         return next_sequence if next_sequence <= self.max_followups else None
     
-    def _load_all_leads_from_csv(self) -> List[Dict]:
-        """Load all leads from CSV without filtering by sent status"""
-        leads = []
-        
+    def _load_all_leads_from_csv(self, only_emails: Optional[AbstractSet[str]] = None) -> List[Dict]:
+        """Load all leads from CSV without filtering by sent status (optionally just the given addresses)"""
         try:
-            with open(self.csv_file, 'r', encoding='utf-8', newline='') as file:
-                # Try to detect if file has BOM
-                first_char = file.read(1)
-                if first_char != '\ufeff':
-                    file.seek(0)
-                
-                reader = csv.DictReader(file)
-                
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        lead = self._process_row(row, row_num)
-                        if lead:
-                            leads.append(lead)
-                    except Exception as e:
-                        continue
-                        
+            parsed, skip_counts, row_notes = self._parse_leads()
         except Exception as e:
             print(f"⚠️ Warning: Error loading leads for follow-up: {e}")
-            
-        return leads 
\ No newline at end of file
+            return []
+        
+        self._skip_counts = skip_counts.copy()
+        self._row_notes = list(row_notes)
+        leads = [lead for lead in (self._resolve_row(email, result, frozenset()) for email, result in parsed) if lead]
+        self._print_skip_summary()
+        if only_emails is not None:
+            return [lead._asdict() for lead in leads if lead.email in only_emails]
+        return [lead._asdict() for lead in leads] 
\ No newline at end of file
@@ -3,172 +3,376 @@
 Cold Email Outreach System - Main Entry Point with Advanced Sending Logic
 """
 
+import argparse
+import csv
+import io
+import logging
 import os
+import re
 import sys
 import random
 import datetime
-from lead_loader import LeadLoader
-from email_sender import EmailSender  
-from template_engine import TemplateEngine
-from warmup_sender import WarmupSender
+from collections import Counter
+from itertools import islice
+from operator import length_hint
+
+# Per-email progress from the batch senders (configured by configure_logging)
+logger = logging.getLogger('cold_emailer')
 
 # Daily limits
 DAILY_COLD_EMAIL_LIMIT = 15
 DAILY_WARMUP_EMAIL_LIMIT = 5
 
+# Abort the campaign when more than a third of a batch this size or larger fails
+BATCH_ABORT_MIN_SIZE = 3
+
+# Environment variables that must be set (and non-empty) before sending
+REQUIRED_ENV_VARS = frozenset({'EMAIL_ADDRESS', 'EMAIL_PASSWORD', 'SMTP_SERVER', 'SMTP_PORT'})
+
+# KEY=value lines of a .env file; comments and blank lines never match
+_ENV_LINE_RE = re.compile(r'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t\r]*$', re.M)
+
+# Bytes read per step when scanning sent_log.csv backwards for today's rows
+TAIL_CHUNK_SIZE = 64 * 1024
+
+class BatchAborted(Exception):
+    """Raised when too many sends in one batch fail (dead relay, bad credentials...)"""
+
+def check_batch_failures(fail_count, count, email_kind):
+    """
+    Circuit breaker for the batch senders
+    
+    Args:
+        fail_count (int): Failed sends so far in the batch
+        count (int): Number of emails in the batch
+        email_kind (str): Kind of email, for the error message
+        
+    Raises:
+        BatchAborted: If more than a third of the batch has failed
+    """
+    if count >= BATCH_ABORT_MIN_SIZE and fail_count * 3 > count:
+        raise BatchAborted(f"{fail_count}/{count} {email_kind} emails in the batch failed")
+
+def configure_logging():
+    """Print the per-email progress log to stdout, each line prefixed with the time"""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', datefmt='%H:%M:%S'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
 def load_env_file():
-    """Load environment variables from .env file"""
-    env_vars = {}
+    """Load environment variables from .env file straight into os.environ"""
     try:
         with open('.env', 'r', encoding='utf-8-sig') as f:  # Handle BOM
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    key, value = line.split('=', 1)
-                    env_vars[key.strip()] = value.strip().strip('"\'')
+            env_text = f.read()
+        os.environ.update({key: value.strip('"\'') for key, value in _ENV_LINE_RE.findall(env_text)})
     except FileNotFoundError:
         print("❌ Error: .env file not found. Please create one based on .env.example")
         sys.exit(1)
-    
-    # Set environment variables
-    for key, value in env_vars.items():
-        os.environ[key] = value
-    
-    return env_vars
 
 def validate_env_vars():
     """Validate required environment variables are present"""
-    required_vars = ['EMAIL_ADDRESS', 'EMAIL_PASSWORD', 'SMTP_SERVER', 'SMTP_PORT']
-    missing_vars = []
-    
-    for var in required_vars:
-        if not os.environ.get(var):
-            missing_vars.append(var)
+    missing_vars = REQUIRED_ENV_VARS - {key for key, value in os.environ.items() if value}
     
     if missing_vars:
-        print(f"❌ Error: Missing required environment variables: {', '.join(missing_vars)}")
+        print(f"❌ Error: Missing required environment variables: {', '.join(sorted(missing_vars))}")
         print("Please check your .env file and ensure all variables are set.")
         sys.exit(1)
 
 def get_today_sent_count():
     """Get count of emails sent today from log"""
     today = datetime.date.today().isoformat()
-    cold_count = 0
-    warmup_count = 0
     
     try:
-        with open('sent_log.csv', 'r') as f:
-            lines = f.readlines()
-            for line in lines[1:]:  # Skip header
-                if line.strip() and today in line and 'sent' in line:
-                    if 'warmup' in line.lower():
-                        warmup_count += 1
-                    else:
-                        cold_count += 1
+        with open('sent_log.csv', 'rb') as f:
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+            if not header or header[0] != 'timestamp':
+                # Unusual layout - tokenize the whole log instead
+                f.seek(0)
+                text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+                reader = csv.reader(text)
+                return _count_sent_rows(next(reader, []), reader)
+            
+            start = f.tell()
+            pos = os.fstat(f.fileno()).st_size
+            
+            # Rows are appended in time order and start with their timestamp, so
+            # read the log backwards in chunks and stop at the first row dated
+            # before today; only today's lines are decoded and tokenized
+            today_bytes = today.encode()
+            lines = []
+            partial = b''
+            reached_older = False
+            while pos > start and not reached_older:
+                step = min(TAIL_CHUNK_SIZE, pos - start)
+                pos -= step
+                f.seek(pos)
+                parts = (f.read(step) + partial).split(b'\n')
+                # The first piece may be cut mid-line; finish it with the next chunk
+                partial = parts.pop(0) if pos > start else b''
+                for line in reversed(parts):
+                    if line.startswith(today_bytes):
+                        lines.append(line.decode('utf-8'))
+                    elif line[:4].isdigit() and line[:10] < today_bytes:
+                        reached_older = True
+                        break
+            
+            lines.reverse()
+            return _count_sent_rows(header, csv.reader(lines))
     except FileNotFoundError:
         # Log file doesn't exist yet, no emails sent today
-        pass
+        return 0, 0
+
+def _count_sent_rows(header, rows):
+    """Count today's sent rows as (cold, warmup), reading columns by header position"""
+    today = datetime.date.today().isoformat()
+    if 'timestamp' not in header:
+        return 0, 0
+    
+    ts_i = header.index('timestamp')
+    # Older logs have no status column and only recorded successful sends
+    status_i = header.index('status') if 'status' in header else None
+    type_i = header.index('type') if 'type' in header else None
+    
+    # Group today's successful sends by email type
+    sent_by_type = Counter(
+        row[type_i] if type_i is not None and len(row) > type_i else ''
+        for row in rows
+        if len(row) > ts_i and row[ts_i].startswith(today)
+        and (status_i is None or (len(row) > status_i and row[status_i] == 'sent'))
+    )
+    
+    warmup_count = sent_by_type['warmup']
+    return sum(sent_by_type.values()) - warmup_count, warmup_count
+
+def build_schedule(cold_needed, warmup_needed, cold_available, followup_available, batch_size=3):
+    """
+    Plan the Phase 2 alternating send pattern
+    Each cycle is 1 warmup followed by up to `batch_size` cold emails, or
+    follow-ups once the cold leads run out (follow-ups count toward the cold quota)
+    
+    Args:
+        cold_needed (int): Cold/follow-up sends still allowed today
+        warmup_needed (int): Warmup sends still allowed today
+        cold_available (int): Uncontacted leads left to send to
+        followup_available (int): Follow-up leads left to send to
+        batch_size (int): Cold or follow-up emails per cycle
+        
+    Returns:
+        List[tuple]: ('warmup' | 'cold' | 'followup', count) steps in send order
+    """
+    schedule = []
+    while warmup_needed > 0 or (cold_needed > 0 and (cold_available > 0 or followup_available > 0)):
+        if warmup_needed > 0:
+            schedule.append(('warmup', 1))
+            warmup_needed -= 1
+        
+        if cold_needed > 0 and cold_available > 0:
+            count = min(batch_size, cold_needed, cold_available)
+            schedule.append(('cold', count))
+            cold_available -= count
+        elif cold_needed > 0 and followup_available > 0:
+            count = min(batch_size, cold_needed, followup_available)
+            schedule.append(('followup', count))
+            followup_available -= count
+        else:
+            continue
+        cold_needed -= count
     
-    return cold_count, warmup_count
+    return schedule
 
-def send_warmup_batch(email_sender, warmup_sender, count):
+async def send_warmup_batch(email_sender, warmup_sender, count):
     """Send a batch of warmup emails with random delays"""
+    if count <= 0:
+        return 0
+    
+    import asyncio
+    
     print(f"🔥 Sending {count} warmup emails...")
     
-    success_count = 0
-    for i in range(count):
-        try:
-            # Get warmup email details
-            warmup_email = warmup_sender.get_random_warmup_email()
-            subject = warmup_sender.get_warmup_subject()
-            body = warmup_sender.get_warmup_body()
-            
-            print(f"📧 Warmup email {i+1}/{count} to {warmup_email}...")
-            
-            # Send warmup email
-            if email_sender.send_email(warmup_email, subject, body, 
-                                     email_type='warmup'):
-                success_count += 1
-                print(f"✅ Warmup email sent successfully")
-            else:
-                print(f"❌ Failed to send warmup email")
-            
-            # Add random delay between warmup emails (except for last one)
-            if i < count - 1:
-                email_sender.add_random_delay('warmup')
+    # Bounds how many sends are in flight; with the default of 1 the batch is
+    # sent strictly in order, each send followed by its random delay
+    semaphore = asyncio.Semaphore(email_sender.max_concurrent_sends)
+    fail_count = 0
+    
+    async def send_one(i):
+        nonlocal fail_count
+        async with semaphore:
+            check_batch_failures(fail_count, count, 'warmup')
+            try:
+                # Get warmup email details
+                warmup_email, subject, body = warmup_sender.next_warmup_message()
                 
-        except Exception as e:
-            print(f"❌ Error sending warmup email: {str(e)}")
-            continue
+                logger.info("📧 Warmup email %d/%d to %s...", i + 1, count, warmup_email)
+                
+                # Send warmup email
+                sent = await email_sender.send_email_async(warmup_email, subject, body, 
+                                                           email_type='warmup')
+                if sent:
+                    logger.info("✅ Warmup email sent successfully")
+                else:
+                    logger.warning("❌ Failed to send warmup email")
+                    fail_count += 1
+                    check_batch_failures(fail_count, count, 'warmup')
+                
+                # Add random delay between warmup emails (except for last one)
+                if i < count - 1:
+                    await email_sender.add_random_delay_async('warmup')
+                return sent
+                    
+            except BatchAborted:
+                raise
+            except Exception as e:
+                logger.error("❌ Error sending warmup email: %s", e)
+                fail_count += 1
+                check_batch_failures(fail_count, count, 'warmup')
+                return False
     
-    return success_count
+    # One SMTP session for the whole batch
+    with email_sender.session():
+        results = await asyncio.gather(*(send_one(i) for i in range(count)))
+    
+    return sum(results)
 
-def send_cold_batch(email_sender, template_engine, leads, count):
+async def send_cold_batch(email_sender, template_engine, leads, count):
     """Send a batch of cold emails with random delays and rotating templates"""
+    if count <= 0 or not leads:
+        return 0
+    
+    import asyncio
+    
     print(f"📧 Sending {count} cold emails...")
     
-    success_count = 0
-    for i in range(min(count, len(leads))):
-        try:
-            lead = leads[i]
-            print(f"📤 Cold email {i+1}/{count} to {lead['first_name']} at {lead['organization']}...")
-            
-            # Get personalized email with rotating template
-            subject, body = template_engine.get_template_pair(lead)
-            
-            # Send cold email
-            if email_sender.send_email(lead['email'], subject, body, lead, 
-                                     email_type='cold'):
-                success_count += 1
-                print(f"✅ Successfully sent to {lead['email']}")
-            else:
-                print(f"❌ Failed to send to {lead['email']}")
-            
-            # Add random delay between cold emails (except for last one)
-            if i < count - 1:
-                email_sender.add_random_delay('cold')
+    semaphore = asyncio.Semaphore(email_sender.max_concurrent_sends)
+    batch = leads[:count]
+    fail_count = 0
+    
+    # Personalized emails with rotating templates for the whole batch
+    pairs = template_engine.render_batch(batch)
+    
+    async def send_one(i, lead, pair):
+        nonlocal fail_count
+        async with semaphore:
+            check_batch_failures(fail_count, len(batch), 'cold')
+            try:
+                logger.info("📤 Cold email %d/%d to %s at %s...", i + 1, count, lead['first_name'], lead['organization'])
                 
-        except Exception as e:
-            print(f"❌ Error processing lead {lead.get('email', 'unknown')}: {str(e)}")
-            continue
+                # Rendering errors surface here, so they count against this lead only
+                if isinstance(pair, Exception):
+                    raise pair
+                subject, body = pair
+                
+                # Send cold email
+                sent = await email_sender.send_email_async(lead['email'], subject, body, lead, 
+                                                           email_type='cold')
+                if sent:
+                    logger.info("✅ Successfully sent to %s", lead['email'])
+                else:
+                    logger.warning("❌ Failed to send to %s", lead['email'])
+                    fail_count += 1
+                    check_batch_failures(fail_count, len(batch), 'cold')
+                
+                # Add random delay between cold emails (except for last one)
+                if i < count - 1:
+                    await email_sender.add_random_delay_async('cold')
+                return sent
+                    
+            except BatchAborted:
+                raise
+            except Exception as e:
+                logger.error("❌ Error processing lead %s: %s", lead.get('email', 'unknown'), e)
+                fail_count += 1
+                check_batch_failures(fail_count, len(batch), 'cold')
+                return False
     
-    return success_count
+    # One SMTP session for the whole batch
+    with email_sender.session():
+        results = await asyncio.gather(*(send_one(i, lead, pair)
+                                         for i, (lead, pair) in enumerate(zip(batch, pairs))))
+    
+    return sum(results)
 
-def send_followup_batch(email_sender, template_engine, followup_leads, count):
+async def send_followup_batch(email_sender, template_engine, followup_leads, count):
     """Send a batch of follow-up emails with random delays"""
+    if count <= 0 or not followup_leads:
+        return 0
+    
+    import asyncio
+    
     print(f"🔄 Sending {count} follow-up emails...")
     
-    success_count = 0
-    for i in range(min(count, len(followup_leads))):
-        try:
-            lead = followup_leads[i]
-            followup_sequence = lead.get('followup_sequence', 1)
-            days_since_last = lead.get('days_since_last', 0)
-            
-            print(f"📤 Follow-up {followup_sequence} to {lead['first_name']} at {lead['organization']} ({days_since_last} days since last contact)...")
-            
-            # Get personalized follow-up email
-            subject, body = template_engine.get_followup_template_pair(lead, followup_sequence)
-            
-            # Send follow-up email
-            if email_sender.send_email(lead['email'], subject, body, lead, 
-                                     email_type='followup', followup_sequence=followup_sequence):
-                success_count += 1
-                print(f"✅ Successfully sent follow-up {followup_sequence} to {lead['email']}")
-            else:
-                print(f"❌ Failed to send follow-up to {lead['email']}")
-            
-            # Add random delay between follow-up emails (except for last one)
-            if i < count - 1:
-                email_sender.add_random_delay('cold')  # Use cold delay timing for follow-ups
+    semaphore = asyncio.Semaphore(email_sender.max_concurrent_sends)
+    batch = followup_leads[:count]
+    fail_count = 0
+    
+    async def send_one(i, lead):
+        nonlocal fail_count
+        async with semaphore:
+            check_batch_failures(fail_count, len(batch), 'follow-up')
+            try:
+                followup_sequence = lead.get('followup_sequence', 1)
+                days_since_last = lead.get('days_since_last', 0)
                 
-        except Exception as e:
-            print(f"❌ Error processing follow-up lead {lead.get('email', 'unknown')}: {str(e)}")
-            continue
+                logger.info("📤 Follow-up %s to %s at %s (%s days since last contact)...",
+                            followup_sequence, lead['first_name'], lead['organization'], days_since_last)
+                
+                # Get personalized follow-up email
+                subject, body = template_engine.get_followup_template_pair(lead, followup_sequence)
+                
+                # Send follow-up email
+                sent = await email_sender.send_email_async(lead['email'], subject, body, lead, 
+                                                           email_type='followup', followup_sequence=followup_sequence)
+                if sent:
+                    logger.info("✅ Successfully sent follow-up %s to %s", followup_sequence, lead['email'])
+                else:
+                    logger.warning("❌ Failed to send follow-up to %s", lead['email'])
+                    fail_count += 1
+                    check_batch_failures(fail_count, len(batch), 'follow-up')
+                
+                # Add random delay between follow-up emails (except for last one)
+                if i < count - 1:
+                    await email_sender.add_random_delay_async('cold')  # Use cold delay timing for follow-ups
+                return sent
+                    
+            except BatchAborted:
+                raise
+            except Exception as e:
+                logger.error("❌ Error processing follow-up lead %s: %s", lead.get('email', 'unknown'), e)
+                fail_count += 1
+                check_batch_failures(fail_count, len(batch), 'follow-up')
+                return False
+    
+    # One SMTP session for the whole batch
+    with email_sender.session():
+        results = await asyncio.gather(*(send_one(i, lead) for i, lead in enumerate(batch)))
     
-    return success_count
+    return sum(results)
+
+def parse_args(argv=None):
+    """
+    Parse command line options
+    
+    Args:
+        argv (list): Arguments to parse (defaults to sys.argv[1:])
+        
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="Cold email outreach with warmup and follow-up sequences")
+    parser.add_argument('--only', choices=('all', 'warmup', 'cold', 'followup'), default='all',
+                        help="send only this kind of email today (default: all)")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    send_warmups = args.only in ('all', 'warmup')
+    send_cold = args.only in ('all', 'cold')
+    send_followups = args.only in ('all', 'followup')
+    
+    configure_logging()
     print("🚀 Starting Advanced Cold Email Outreach System...")
     print("=" * 60)
     print("📋 Features: Rotating Templates | Random Delays | Smart Alternating")
@@ -184,20 +388,40 @@ def main():
     print(f"   Cold emails sent: {cold_sent_today}/{DAILY_COLD_EMAIL_LIMIT}")
     print(f"   Warmup emails sent: {warmup_sent_today}/{DAILY_WARMUP_EMAIL_LIMIT}")
     
+    # Follow-ups count toward the cold quota
+    remaining_cold = DAILY_COLD_EMAIL_LIMIT - cold_sent_today if send_cold or send_followups else 0
+    remaining_warmup = DAILY_WARMUP_EMAIL_LIMIT - warmup_sent_today if send_warmups else 0
+    
     # Check if daily limits already reached
-    if cold_sent_today >= DAILY_COLD_EMAIL_LIMIT and warmup_sent_today >= DAILY_WARMUP_EMAIL_LIMIT:
-        print(f"\n✅ All daily limits reached!")
+    if remaining_cold <= 0 and remaining_warmup <= 0:
+        if args.only == 'all':
+            print(f"\n✅ All daily limits reached!")
+        else:
+            print(f"\n✅ Daily limit for {args.only} emails reached!")
         return
     
+    # Import the subsystems (and asyncio) only once there is something to send,
+    # so the "limits reached" path above never loads them
+    import asyncio
+    from lead_loader import LeadLoader
+    from email_sender import EmailSender
+    from template_engine import TemplateEngine
+    from warmup_sender import WarmupSender
+    
     # Initialize components
+    email_sender = None
     try:
-        lead_loader = LeadLoader('apollo-contacts-export.csv')
         email_sender = EmailSender()
-        template_engine = TemplateEngine()
-        warmup_sender = WarmupSender()
-        
-        print(f"\n🎯 Template Engine loaded with {template_engine.get_template_count()} rotating templates")
-        print(f"🔄 Follow-up Engine loaded with {template_engine.get_followup_template_count()} follow-up templates")
+        # Only build the subsystems the selected --only mode uses
+        lead_loader = template_engine = warmup_sender = None
+        if send_cold or send_followups:
+            lead_loader = LeadLoader('apollo-contacts-export.csv')
+            template_engine = TemplateEngine()
+            
+            print(f"\n🎯 Template Engine loaded with {template_engine.get_template_count()} rotating templates")
+            print(f"🔄 Follow-up Engine loaded with {template_engine.get_followup_template_count()} follow-up templates")
+        if send_warmups:
+            warmup_sender = WarmupSender()
         
         # Test SMTP connection first
         print(f"\n🔗 Testing SMTP connection...")
@@ -206,97 +430,108 @@ def main():
             sys.exit(1)
         
         # Load leads for cold emails
-        remaining_cold = DAILY_COLD_EMAIL_LIMIT - cold_sent_today
         leads = []
         followup_leads = []
         
-        if remaining_cold > 0:
+        if remaining_cold > 0 and send_cold:
             print(f"\n📋 Loading leads for {remaining_cold} cold emails...")
             leads = lead_loader.load_leads()
             
-            if not leads:
+            if leads:
+                print(f"📋 Found {len(leads)} uncontacted leads")
+            elif send_followups:
                 print("✅ No new leads to process. Checking for follow-up opportunities...")
-                # Load follow-up leads when no new leads available
-                followup_leads = lead_loader.load_followup_leads()
-                if not followup_leads:
+            else:
+                print("✅ No new leads to process.")
+        
+        if remaining_cold > 0 and send_followups:
+            # Follow-ups replace missing new leads or fill remaining capacity - load them once either way
+            followup_leads = lead_loader.load_followup_leads()
+            if not followup_leads:
+                if send_cold and not leads:
                     print("✅ No leads ready for follow-up either. All prospects are up to date.")
-                else:
-                    print(f"🔄 Found {len(followup_leads)} leads ready for follow-up")
+                elif not send_cold:
+                    print("✅ No leads ready for follow-up. All prospects are up to date.")
+            elif leads:
+                print(f"🔄 Also found {len(followup_leads)} leads ready for follow-up")
             else:
-                print(f"📋 Found {len(leads)} uncontacted leads")
-                # Also load follow-up leads to fill remaining capacity
-                followup_leads = lead_loader.load_followup_leads()
-                if followup_leads:
-                    print(f"🔄 Also found {len(followup_leads)} leads ready for follow-up")
+                print(f"🔄 Found {len(followup_leads)} leads ready for follow-up")
         
-        # PHASE 1: Send initial warmup batch (5 emails)
-        remaining_warmup = DAILY_WARMUP_EMAIL_LIMIT - warmup_sent_today
-        if remaining_warmup > 0:
-            initial_warmup_count = min(5, remaining_warmup)
-            print(f"\n🔥 PHASE 1: Initial warmup batch ({initial_warmup_count} emails)")
+        # One SMTP session for the whole campaign (the batch sessions nest inside it)
+        with email_sender.session():
+            # PHASE 1: Send initial warmup batch (5 emails)
+            if remaining_warmup > 0:
+                initial_warmup_count = min(5, remaining_warmup)
+                print(f"\n🔥 PHASE 1: Initial warmup batch ({initial_warmup_count} emails)")
             
-            warmup_success = send_warmup_batch(email_sender, warmup_sender, initial_warmup_count)
-            warmup_sent_today += warmup_success
-            remaining_warmup -= warmup_success
+                warmup_success = asyncio.run(send_warmup_batch(email_sender, warmup_sender, initial_warmup_count))
+                warmup_sent_today += warmup_success
+                remaining_warmup -= warmup_success
             
-            print(f"✅ Phase 1 complete: {warmup_success}/{initial_warmup_count} warmup emails sent")
+                print(f"✅ Phase 1 complete: {warmup_success}/{initial_warmup_count} warmup emails sent")
         
-        # PHASE 2: Alternating pattern with cold emails and follow-ups
-        if remaining_cold > 0 or remaining_warmup > 0:
-            print(f"\n📧 PHASE 2: Alternating send pattern")
-            if leads and followup_leads:
-                print(f"   Pattern: 1 warmup → mix of cold/follow-up emails → repeat")
-            elif leads:
-                print(f"   Pattern: 1 warmup → 3 cold → 1 warmup → 3 cold...")
-            elif followup_leads:
-                print(f"   Pattern: 1 warmup → 3 follow-up → 1 warmup → 3 follow-up...")
+            # PHASE 2: Alternating pattern with cold emails and follow-ups
+            if remaining_cold > 0 or remaining_warmup > 0:
+                print(f"\n📧 PHASE 2: Alternating send pattern")
+                if not send_warmups:
+                    print(f"   Pattern: batches of 3 {args.only} emails (warmups skipped)")
+                elif leads and followup_leads:
+                    print(f"   Pattern: 1 warmup → mix of cold/follow-up emails → repeat")
+                elif leads:
+                    print(f"   Pattern: 1 warmup → 3 cold → 1 warmup → 3 cold...")
+                elif followup_leads:
+                    print(f"   Pattern: 1 warmup → 3 follow-up → 1 warmup → 3 follow-up...")
             
-            cold_sent_phase2 = 0
-            warmup_sent_phase2 = 0
-            leads_index = 0
-            followup_index = 0
+                cold_sent_phase2 = 0
+                warmup_sent_phase2 = 0
+                # Each lead is handed out once, in order, across all rounds
+                leads_iter = iter(leads)
+                followup_iter = iter(followup_leads)
             
-            while (cold_sent_phase2 < remaining_cold or warmup_sent_phase2 < remaining_warmup):
-                
-                # Send 1 warmup email (if quota available)
-                if warmup_sent_phase2 < remaining_warmup:
-                    print(f"\n🔄 Alternating: Sending 1 warmup email...")
-                    warmup_batch_success = send_warmup_batch(email_sender, warmup_sender, 1)
-                    warmup_sent_phase2 += warmup_batch_success
-                    warmup_sent_today += warmup_batch_success
-                
-                # Send cold emails (if quota and leads available)
-                if cold_sent_phase2 < remaining_cold and leads_index < len(leads):
-                    cold_batch_size = min(3, remaining_cold - cold_sent_phase2, len(leads) - leads_index)
-                    print(f"\n🔄 Alternating: Sending {cold_batch_size} cold emails...")
-                    cold_batch_leads = leads[leads_index:leads_index + cold_batch_size]
-                    
-                    cold_batch_success = send_cold_batch(email_sender, template_engine, 
-                                                       cold_batch_leads, cold_batch_size)
-                    cold_sent_phase2 += cold_batch_success
-                    cold_sent_today += cold_batch_success
-                    leads_index += cold_batch_size
+                # Plan the whole alternating pattern up front; if sends fail, plan
+                # another round for the shortfall with the leads that are left
+                while True:
+                    schedule = build_schedule(remaining_cold - cold_sent_phase2, remaining_warmup - warmup_sent_phase2,
+                                              length_hint(leads_iter), length_hint(followup_iter))
+                    if not schedule:
+                        break
                 
-                # Send follow-up emails if no more cold leads or cold quota filled
-                elif followup_index < len(followup_leads) and cold_sent_phase2 < remaining_cold:
-                    followup_batch_size = min(3, remaining_cold - cold_sent_phase2, len(followup_leads) - followup_index)
-                    print(f"\n🔄 Alternating: Sending {followup_batch_size} follow-up emails...")
-                    followup_batch_leads = followup_leads[followup_index:followup_index + followup_batch_size]
+                    # Resolve the schedule into concrete batches, then just dispatch them
+                    send_plan = []
+                    for kind, count in schedule:
+                        if kind == 'cold':
+                            send_plan.append((kind, list(islice(leads_iter, count))))
+                        elif kind == 'followup':
+                            send_plan.append((kind, list(islice(followup_iter, count))))
+                        else:
+                            send_plan.append((kind, count))
                     
-                    followup_batch_success = send_followup_batch(email_sender, template_engine,
-                                                               followup_batch_leads, followup_batch_size)
-                    cold_sent_phase2 += followup_batch_success  # Follow-ups count toward cold quota
-                    cold_sent_today += followup_batch_success
-                    followup_index += followup_batch_size
+                    round_sent = 0
+                    for kind, batch in send_plan:
+                        if kind == 'warmup':
+                            print(f"\n🔄 Alternating: Sending 1 warmup email...")
+                            sent = asyncio.run(send_warmup_batch(email_sender, warmup_sender, batch))
+                            warmup_sent_phase2 += sent
+                            warmup_sent_today += sent
+                        elif kind == 'cold':
+                            print(f"\n🔄 Alternating: Sending {len(batch)} cold emails...")
+                            sent = asyncio.run(send_cold_batch(email_sender, template_engine, batch, len(batch)))
+                            cold_sent_phase2 += sent
+                            cold_sent_today += sent
+                        else:
+                            print(f"\n🔄 Alternating: Sending {len(batch)} follow-up emails...")
+                            sent = asyncio.run(send_followup_batch(email_sender, template_engine, batch, len(batch)))
+                            cold_sent_phase2 += sent  # Follow-ups count toward cold quota
+                            cold_sent_today += sent
+                        round_sent += sent
                 
-                # Break if we've reached all limits or run out of leads
-                if ((cold_sent_today >= DAILY_COLD_EMAIL_LIMIT and warmup_sent_today >= DAILY_WARMUP_EMAIL_LIMIT) or
-                    (leads_index >= len(leads) and followup_index >= len(followup_leads) and warmup_sent_phase2 >= remaining_warmup)):
-                    break
+                    # Nothing got through this round - don't keep retrying
+                    if round_sent == 0:
+                        break
             
-            print(f"\n✅ Phase 2 complete:")
-            print(f"   Cold emails: {cold_sent_phase2} sent")
-            print(f"   Warmup emails: {warmup_sent_phase2} sent")
+                print(f"\n✅ Phase 2 complete:")
+                print(f"   Cold emails: {cold_sent_phase2} sent")
+                print(f"   Warmup emails: {warmup_sent_phase2} sent")
         
         # Final status
         print(f"\n🎉 Campaign completed!")
@@ -316,6 +551,10 @@ def main():
         print(f"\n✨ Advanced cold email system with follow-ups completed successfully!")
         print(f"🎯 Templates rotated randomly | 📡 Smart delays applied | 🔄 Follow-up sequences active")
         
+    except BatchAborted as e:
+        print(f"\n🛑 Campaign aborted: {str(e)}")
+        print("Please check your SMTP server and credentials before sending again.")
+        sys.exit(2)
     except FileNotFoundError as e:
         print(f"❌ Error: Required file not found - {str(e)}")
         print("Please ensure 'apollo-contacts-export.csv' exists in the current directory.")
@@ -323,6 +562,10 @@ def main():
     except Exception as e:
         print(f"❌ Unexpected error: {str(e)}")
         sys.exit(1)
+    finally:
+        # Close the persistent SMTP connection
+        if email_sender:
+            email_sender.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
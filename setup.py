@@ -76,6 +76,7 @@ def check_required_files():
     required_files = [
         'main.py',
         'email_sender.py',
+        'smtp_transport.py',
         'lead_loader.py',
         'template_engine.py',
         'warmup_sender.py'
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+SMTP Transport Module - Pipelined SMTP connections and a shared connection pool
+Kept apart from email_sender so smtplib and ssl are only imported once sending starts
+"""
+
+import queue
+import re
+import smtplib
+import threading
+from contextlib import contextmanager
+
+# SMTP reply codes that mean the server dropped or refused the session;
+# the message is retried once on a fresh connection
+RECONNECT_CODES = {421, 450, 454}
+
+# Temporary failures worth retrying with exponential backoff
+TRANSIENT_CODES = {421, 450, 451, 452, 454}
+
+# Line endings and leading dots as normalised by smtplib before DATA
+_EOL_RE = re.compile(r'(?:\r\n|\n|\r(?!\n))')
+_LEADING_DOT_RE = re.compile(br'(?m)^\.')
+
+class PipelinedSMTP(smtplib.SMTP):
+    """
+    SMTP client that pipelines MAIL FROM, RCPT TO and DATA (RFC 2920)
+    When the server advertises PIPELINING, the envelope commands go out in a
+    single write and their replies are read back in order, saving two round
+    trips per message. Otherwise falls back to the standard sendmail
+    """
+    
+    def sendmail(self, from_addr, to_addrs, msg, mail_options=(), rcpt_options=()):
+        self.ehlo_or_helo_if_needed()
+        if not self.has_extn('pipelining') or any(opt.lower() == 'smtputf8' for opt in mail_options):
+            return super().sendmail(from_addr, to_addrs, msg, mail_options, rcpt_options)
+        
+        if isinstance(msg, str):
+            msg = _EOL_RE.sub('\r\n', msg).encode('ascii')
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        
+        esmtp_opts = list(mail_options)
+        if self.has_extn('size'):
+            esmtp_opts.insert(0, "size=%d" % len(msg))
+        mail_opts = (' ' + ' '.join(esmtp_opts)) if esmtp_opts else ''
+        rcpt_opts = (' ' + ' '.join(rcpt_options)) if rcpt_options else ''
+        
+        # One write for the whole envelope
+        commands = ["mail FROM:%s%s" % (smtplib.quoteaddr(from_addr), mail_opts)]
+        commands += ["rcpt TO:%s%s" % (smtplib.quoteaddr(addr), rcpt_opts) for addr in to_addrs]
+        commands.append("data")
+        self.send(''.join(command + smtplib.CRLF for command in commands))
+        
+        # Read the replies in the order the commands were sent
+        code, resp = self.getreply()
+        if code == 421:
+            self.close()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        mail_reply = (code, resp)
+        
+        senderrs = {}
+        for addr in to_addrs:
+            code, resp = self.getreply()
+            if code == 421:
+                self.close()
+                senderrs[addr] = (code, resp)
+                raise smtplib.SMTPRecipientsRefused(senderrs)
+            if code not in (250, 251):
+                senderrs[addr] = (code, resp)
+        
+        data_code, data_resp = self.getreply()
+        if data_code == 354 and (mail_reply[0] != 250 or len(senderrs) == len(to_addrs)):
+            # Server accepted DATA despite a refused envelope - send an empty message
+            self.send(b"." + smtplib.bCRLF)
+            self.getreply()
+        
+        if mail_reply[0] != 250:
+            self._rset()
+            raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+        if len(senderrs) == len(to_addrs):
+            self._rset()
+            raise smtplib.SMTPRecipientsRefused(senderrs)
+        if data_code != 354:
+            if data_code == 421:
+                self.close()
+            else:
+                self._rset()
+            raise smtplib.SMTPDataError(data_code, data_resp)
+        
+        # Send the message body
+        data = _LEADING_DOT_RE.sub(b'..', msg)
+        if data[-2:] != smtplib.bCRLF:
+            data += smtplib.bCRLF
+        self.send(data + b"." + smtplib.bCRLF)
+        code, resp = self.getreply()
+        if code != 250:
+            if code == 421:
+                self.close()
+            else:
+                self._rset()
+            raise smtplib.SMTPDataError(code, resp)
+        
+        return senderrs
+
+class PipelinedSMTP_SSL(PipelinedSMTP, smtplib.SMTP_SSL):
+    """SSL variant of PipelinedSMTP"""
+
+def is_connection_error(error: Exception) -> bool:
+    """Check whether an SMTP error leaves the connection unusable"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code in RECONNECT_CODES
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        # Protocol-level refusal (e.g. bad recipient) - the session is still fine
+        return False
+    return isinstance(error, OSError)
+
+def is_transient_error(error: Exception) -> bool:
+    """Check whether an SMTP error is temporary and worth retrying with backoff"""
+    return is_connection_error(error) or (
+        isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in TRANSIENT_CODES)
+
+class SMTPPool:
+    """
+    Pool of persistent, logged-in SMTP connections shared by worker threads
+    Connections are opened on demand up to `size` and recycled after
+    `max_msgs_per_connection` messages
+    """
+    
+    def __init__(self, connect, size: int = 5, max_msgs_per_connection: int = 100):
+        self._connect = connect
+        self.size = size
+        self.max_msgs_per_connection = max_msgs_per_connection
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._open_count = 0
+        self._msg_counts = {}
+    
+    def acquire(self):
+        """Take an idle connection, opening a new one if the pool isn't full"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_open = self._open_count < self.size
+            if can_open:
+                self._open_count += 1
+        
+        if not can_open:
+            return self._idle.get()
+        
+        try:
+            server = self._connect()
+        except Exception:
+            with self._lock:
+                self._open_count -= 1
+            raise
+        
+        with self._lock:
+            self._msg_counts[id(server)] = 0
+        return server
+    
+    def release(self, server, broken: bool = False):
+        """Return a connection to the pool, or retire it if broken or worn out"""
+        with self._lock:
+            self._msg_counts[id(server)] = self._msg_counts.get(id(server), 0) + 1
+            retire = broken or self._msg_counts[id(server)] >= self.max_msgs_per_connection
+            if retire:
+                self._msg_counts.pop(id(server), None)
+                self._open_count -= 1
+        
+        if retire:
+            self._quit(server)
+        else:
+            self._idle.put(server)
+    
+    @contextmanager
+    def connection(self):
+        """Context manager that acquires a connection and always releases it"""
+        server = self.acquire()
+        try:
+            yield server
+        except Exception as e:
+            self.release(server, broken=is_connection_error(e))
+            raise
+        else:
+            self.release(server)
+    
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._msg_counts.pop(id(server), None)
+                self._open_count -= 1
+            self._quit(server)
+    
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
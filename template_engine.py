@@ -3,10 +3,83 @@
 Template Engine - Handles email personalization with rotating templates
 """
 
+import functools
 import random
 import re
 from typing import Dict, List
 
+# Every supported placeholder, matched in a single pass over the template text;
+# the capturing group makes split() return the placeholders between the literals
+_PLACEHOLDER_RE = re.compile(
+    r'(\{\{(?:Company Name|First Name|Last Name|Title|City|State|Country|industry or location)\}\})')
+
+# Placeholder ids: position of each placeholder's value in a lead values tuple
+_PLACEHOLDER_IDS = {
+    '{{Company Name}}': 0,
+    '{{First Name}}': 1,
+    '{{Last Name}}': 2,
+    '{{Title}}': 3,
+    '{{City}}': 4,
+    '{{State}}': 5,
+    '{{Country}}': 6,
+    '{{industry or location}}': 7,
+}
+
+# Any {{...}} token, and the set it's checked against when validating a template
+_ANY_PLACEHOLDER_RE = re.compile(r'\{\{[^}]+\}\}')
+_VALID_PLACEHOLDERS = frozenset(_PLACEHOLDER_IDS)
+
+# Lead field and default value behind each direct placeholder, in placeholder
+# id order; the sample defaults fill in preview leads
+_FIELD_SCHEMA = (
+    # (field, default, sample default)
+    ('organization', 'your company', 'Sample Company'),
+    ('first_name', 'there', 'John'),
+    ('last_name', '', 'Smith'),
+    ('title', '', 'CEO'),
+    ('city', '', 'London'),
+    ('state', '', 'England'),
+    ('country', '', 'United Kingdom'),
+)
+
+# Lead fields the placeholder values are computed from, and the marker for a
+# field the lead doesn't have (so per-placeholder defaults still apply)
+_VALUE_FIELDS = tuple(field for field, _, _ in _FIELD_SCHEMA) + ('industry',)
+_MISSING = object()
+
+# Sample leads whose rendered previews each engine keeps
+_PREVIEW_CACHE_SIZE = 16
+
+# Sign-off shared by every template body
+_SIGNATURE = """<p>Best regards,<br>
+Felix van Dijk<br>
+Founder — F van Dijk Ltd<br>
+📞 07956 171906<br>
+🌐 https://felixvandijk.dev/business.html</p>"""
+
+def _tokenize(text: str) -> tuple:
+    """
+    Split template text once into literal segments and placeholder ids
+    
+    Args:
+        text (str): Template text
+        
+    Returns:
+        tuple: (literals, placeholder_ids) - literals has one more entry than placeholder_ids
+    """
+    parts = _PLACEHOLDER_RE.split(text)
+    return tuple(parts[0::2]), tuple(_PLACEHOLDER_IDS[key] for key in parts[1::2])
+
+@functools.lru_cache(maxsize=256)
+def _render_tokens(tokens: tuple, values: tuple) -> str:
+    """Join a tokenized template with a lead's values, memoized per template and lead values"""
+    literals, placeholder_ids = tokens
+    parts = [literals[0]]
+    for placeholder_id, literal in zip(placeholder_ids, literals[1:]):
+        parts.append(values[placeholder_id])
+        parts.append(literal)
+    return ''.join(parts)
+
 class TemplateEngine:
     def __init__(self):
         # Define the 3 rotating templates with proper HTML formatting
@@ -21,11 +94,7 @@ class TemplateEngine:
 
 <p>Would you be open to a quick call sometime this week to see what I could build for {{Company Name}}?</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             },
             {
                 "subject": "Helping {{Company Name}} run smoother",
@@ -37,11 +106,7 @@ Founder — F van Dijk Ltd<br>
 
 <p>Would you be open to a 10-minute call to see if there's anything I could simplify for {{Company Name}}?</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             },
             {
                 "subject": "Built one tool — got 10+ new clients",
@@ -53,11 +118,7 @@ Founder — F van Dijk Ltd<br>
 
 <p>If I could help {{Company Name}} do something similar, would you be up for a quick chat this week?</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             }
         ]
         
@@ -73,11 +134,7 @@ Founder — F van Dijk Ltd<br>
 
 <p>If streamlining any part of {{Company Name}}'s operations sounds useful, I'd love to have a quick 10-minute conversation about what's possible.</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             },
             {
                 "subject": "{{Company Name}} — 3 ways I could help",
@@ -93,11 +150,7 @@ Founder — F van Dijk Ltd<br>
 
 <p>Would any of these be valuable for {{Company Name}}? Happy to jump on a brief call to explore what makes sense.</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             },
             {
                 "subject": "Last email — {{Company Name}} automation opportunity",
@@ -111,14 +164,23 @@ Founder — F van Dijk Ltd<br>
 
 <p>If not, no worries at all — I completely understand you're busy running {{Company Name}}.</p>
 
-<p>Best regards,<br>
-Felix van Dijk<br>
-Founder — F van Dijk Ltd<br>
-📞 07956 171906<br>
-🌐 https://felixvandijk.dev/business.html</p>"""
+""" + _SIGNATURE
             }
         ]
         
+        # Tokenize every template once so sends never rescan the text
+        for template in self.templates + self.followup_templates:
+            template["subject_tokens"] = _tokenize(template["subject"])
+            template["body_tokens"] = _tokenize(template["body"])
+        
+        # Only work out the industry/location value if some template uses it
+        self._uses_industry_or_location = any(
+            _PLACEHOLDER_IDS['{{industry or location}}'] in template["subject_tokens"][1] + template["body_tokens"][1]
+            for template in self.templates + self.followup_templates)
+        
+        # Rendered previews, keyed on the sample lead's sorted items
+        self._preview_cache = {}
+        
     def get_random_template(self) -> Dict:
         """Get a random template from the available templates"""
         return random.choice(self.templates)
@@ -134,24 +196,9 @@ Founder — F van Dijk Ltd<br>
             str: Personalized subject line
         """
         template = self.get_random_template()
-        subject = template["subject"]
         
         # Replace placeholders with lead data
-        replacements = {
-            '{{Company Name}}': lead.get('organization', 'your company'),
-            '{{First Name}}': lead.get('first_name', 'there'),
-            '{{Last Name}}': lead.get('last_name', ''),
-            '{{Title}}': lead.get('title', ''),
-            '{{City}}': lead.get('city', ''),
-            '{{State}}': lead.get('state', ''),
-            '{{Country}}': lead.get('country', ''),
-            '{{industry or location}}': self._get_industry_or_location(lead)
-        }
-        
-        for placeholder, value in replacements.items():
-            subject = subject.replace(placeholder, str(value))
-            
-        return subject
+        return _render_tokens(template["subject_tokens"], self._lead_values(lead))
     
     def personalize_body(self, lead: Dict, template_index: int = None) -> str:
         """
@@ -168,25 +215,9 @@ Founder — F van Dijk Ltd<br>
             template = self.templates[template_index]
         else:
             template = self.get_random_template()
-            
-        body = template["body"]
         
         # Replace placeholders with lead data
-        replacements = {
-            '{{Company Name}}': lead.get('organization', 'your company'),
-            '{{First Name}}': lead.get('first_name', 'there'),
-            '{{Last Name}}': lead.get('last_name', ''),
-            '{{Title}}': lead.get('title', ''),
-            '{{City}}': lead.get('city', ''),
-            '{{State}}': lead.get('state', ''),
-            '{{Country}}': lead.get('country', ''),
-            '{{industry or location}}': self._get_industry_or_location(lead)
-        }
-        
-        for placeholder, value in replacements.items():
-            body = body.replace(placeholder, str(value))
-            
-        return body
+        return _render_tokens(template["body_tokens"], self._lead_values(lead))
     
     def get_template_pair(self, lead: Dict) -> tuple:
         """
@@ -201,27 +232,70 @@ Founder — F van Dijk Ltd<br>
         template = self.get_random_template()
         
         # Replace placeholders in both subject and body
-        replacements = {
-            '{{Company Name}}': lead.get('organization', 'your company'),
-            '{{First Name}}': lead.get('first_name', 'there'),
-            '{{Last Name}}': lead.get('last_name', ''),
-            '{{Title}}': lead.get('title', ''),
-            '{{City}}': lead.get('city', ''),
-            '{{State}}': lead.get('state', ''),
-            '{{Country}}': lead.get('country', ''),
-            '{{industry or location}}': self._get_industry_or_location(lead)
-        }
+        values = self._lead_values(lead)
+        return (_render_tokens(template["subject_tokens"], values),
+                _render_tokens(template["body_tokens"], values))
+    
+    def render_batch(self, leads: List[Dict]) -> List:
+        """
+        Get matching subject and body pairs for many leads at once
+        
+        Args:
+            leads (List[Dict]): Lead information for each email
+            
+        Returns:
+            List[tuple]: (subject, body) per lead, each from a randomly rotated
+            template - or the exception raised rendering that lead, so one bad
+            lead doesn't fail the whole batch
+        """
+        # One RNG call picks every lead's template
+        templates = random.choices(self.templates, k=len(leads))
         
-        subject = template["subject"]
-        body = template["body"]
+        pairs = []
+        for template, lead in zip(templates, leads):
+            try:
+                values = self._lead_values(lead)
+                pairs.append((_render_tokens(template["subject_tokens"], values),
+                              _render_tokens(template["body_tokens"], values)))
+            except Exception as e:
+                pairs.append(e)
+        return pairs
+    
+    def _lead_values(self, lead: Dict) -> tuple:
+        """
+        Build the placeholder values for a lead as a hashable tuple
         
-        for placeholder, value in replacements.items():
-            subject = subject.replace(placeholder, str(value))
-            body = body.replace(placeholder, str(value))
+        Args:
+            lead (Dict): Lead information
             
-        return subject, body
+        Returns:
+            tuple: Values indexed by placeholder id (see _PLACEHOLDER_IDS)
+        """
+        # Keyed on the raw field values, so subject, body and repeat renders
+        # for the same lead share one computation
+        fields = tuple(lead.get(name, _MISSING) for name in _VALUE_FIELDS)
+        try:
+            return self._values_for_fields(fields, self._uses_industry_or_location)
+        except TypeError:
+            # Unhashable field value - compute without the cache
+            return self._values_for_fields.__wrapped__(fields, self._uses_industry_or_location)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _values_for_fields(fields: tuple, with_industry_or_location: bool) -> tuple:
+        """Placeholder values for a lead given as a _VALUE_FIELDS tuple (_MISSING for absent fields)"""
+        values = [str(default if value is _MISSING else value)
+                  for value, (_, default, _) in zip(fields, _FIELD_SCHEMA)]
+        if with_industry_or_location:
+            lead = {name: value for name, value in zip(_VALUE_FIELDS, fields) if value is not _MISSING}
+            values.append(TemplateEngine._get_industry_or_location(lead))
+        else:
+            # No template renders it
+            values.append('')
+        return tuple(values)
     
-    def _get_industry_or_location(self, lead: Dict) -> str:
+    @staticmethod
+    def _get_industry_or_location(lead: Dict) -> str:
         """
         Get industry or location for the custom merge field
         Prioritizes industry, falls back to location
@@ -263,16 +337,9 @@ Founder — F van Dijk Ltd<br>
         issues = []
         
         # Check for unmatched placeholders
-        placeholders = re.findall(r'\{\{[^}]+\}\}', template_text)
-        valid_placeholders = [
-            '{{First Name}}', '{{Last Name}}', '{{Company Name}}', 
-            '{{Title}}', '{{City}}', '{{State}}', '{{Country}}',
-            '{{industry or location}}'
-        ]
-        
-        for placeholder in placeholders:
-            if placeholder not in valid_placeholders:
-                issues.append(f"Unknown placeholder: {placeholder}")
+        placeholders = _ANY_PLACEHOLDER_RE.findall(template_text)
+        issues.extend(f"Unknown placeholder: {placeholder}"
+                      for placeholder in placeholders if placeholder not in _VALID_PLACEHOLDERS)
         
         # Check for basic HTML structure if contains HTML
         if '<p>' in template_text and '</p>' not in template_text:
@@ -314,25 +381,9 @@ Founder — F van Dijk Ltd<br>
             template = self.get_random_followup_template()
         
         # Replace placeholders in both subject and body
-        replacements = {
-            '{{Company Name}}': lead.get('organization', 'your company'),
-            '{{First Name}}': lead.get('first_name', 'there'),
-            '{{Last Name}}': lead.get('last_name', ''),
-            '{{Title}}': lead.get('title', ''),
-            '{{City}}': lead.get('city', ''),
-            '{{State}}': lead.get('state', ''),
-            '{{Country}}': lead.get('country', ''),
-            '{{industry or location}}': self._get_industry_or_location(lead)
-        }
-        
-        subject = template["subject"]
-        body = template["body"]
-        
-        for placeholder, value in replacements.items():
-            subject = subject.replace(placeholder, str(value))
-            body = body.replace(placeholder, str(value))
-            
-        return subject, body
+        values = self._lead_values(lead)
+        return (_render_tokens(template["subject_tokens"], values),
+                _render_tokens(template["body_tokens"], values))
     
     def preview_all_templates(self, sample_lead: Dict) -> List[Dict]:
         """
@@ -344,29 +395,37 @@ Founder — F van Dijk Ltd<br>
         Returns:
             List[Dict]: List of template previews
         """
+        key = tuple(sorted(sample_lead.items()))
+        try:
+            previews = self._preview_cache.get(key)
+        except TypeError:
+            # Unhashable sample values - render without the cache
+            key = previews = None
+        
+        if previews is None:
+            previews = self._render_previews(sample_lead)
+            if key is not None:
+                if len(self._preview_cache) >= _PREVIEW_CACHE_SIZE:
+                    # Drop the oldest entry
+                    del self._preview_cache[next(iter(self._preview_cache))]
+                self._preview_cache[key] = previews
+        
+        # Copies, so callers can't alter the cached previews
+        return [dict(preview) for preview in previews]
+    
+    def _render_previews(self, sample_lead: Dict) -> tuple:
+        """Render every template with the sample lead (see preview_all_templates)"""
         previews = []
         
+        # Sample values stand in for any fields the sample lead leaves out
+        values = tuple(str(sample_lead.get(field, sample_default)) for field, _, sample_default in _FIELD_SCHEMA)
+        values += (self._get_industry_or_location(sample_lead),)
+        
         # Preview regular templates
         for i, template in enumerate(self.templates):
-            subject = template["subject"]
-            body = template["body"]
+            subject = _render_tokens(template["subject_tokens"], values)
+            body = _render_tokens(template["body_tokens"], values)
             
-            # Replace placeholders
-            replacements = {
-                '{{Company Name}}': sample_lead.get('organization', 'Sample Company'),
-                '{{First Name}}': sample_lead.get('first_name', 'John'),
-                '{{Last Name}}': sample_lead.get('last_name', 'Smith'),
-                '{{Title}}': sample_lead.get('title', 'CEO'),
-                '{{City}}': sample_lead.get('city', 'London'),
-                '{{State}}': sample_lead.get('state', 'England'),
-                '{{Country}}': sample_lead.get('country', 'United Kingdom'),
-                '{{industry or location}}': self._get_industry_or_location(sample_lead)
-            }
-            
-            for placeholder, value in replacements.items():
-                subject = subject.replace(placeholder, str(value))
-                body = body.replace(placeholder, str(value))
-                
             previews.append({
                 'template_index': i + 1,
                 'template_type': 'cold',
@@ -376,25 +435,9 @@ Founder — F van Dijk Ltd<br>
         
         # Preview follow-up templates
         for i, template in enumerate(self.followup_templates):
-            subject = template["subject"]
-            body = template["body"]
-            
-            # Replace placeholders
-            replacements = {
-                '{{Company Name}}': sample_lead.get('organization', 'Sample Company'),
-                '{{First Name}}': sample_lead.get('first_name', 'John'),
-                '{{Last Name}}': sample_lead.get('last_name', 'Smith'),
-                '{{Title}}': sample_lead.get('title', 'CEO'),
-                '{{City}}': sample_lead.get('city', 'London'),
-                '{{State}}': sample_lead.get('state', 'England'),
-                '{{Country}}': sample_lead.get('country', 'United Kingdom'),
-                '{{industry or location}}': self._get_industry_or_location(sample_lead)
-            }
+            subject = _render_tokens(template["subject_tokens"], values)
+            body = _render_tokens(template["body_tokens"], values)
             
-            for placeholder, value in replacements.items():
-                subject = subject.replace(placeholder, str(value))
-                body = body.replace(placeholder, str(value))
-                
             previews.append({
                 'template_index': i + 1,
                 'template_type': 'followup',
@@ -402,4 +445,4 @@ Founder — F van Dijk Ltd<br>
                 'body': body
             })
             
-        return previews 
\ No newline at end of file
+        return tuple(previews) 
\ No newline at end of file
@@ -1,24 +1,24 @@
 #!/usr/bin/env python3
 import os
+import re
+
+# KEY=value lines (comments and blank lines don't match), same format as main.py
+_ENV_LINE_RE = re.compile(r'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t\r]*$', re.M)
 
 def load_env_file():
     """Load environment variables from .env file"""
-    env_vars = {}
     try:
-        with open('.env', 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    key, value = line.split('=', 1)
-                    env_vars[key.strip()] = value.strip().strip('"\'')
-                    print(f"Loaded: {key.strip()} = {value.strip()}")
+        with open('.env', 'r', encoding='utf-8-sig') as f:  # Handle BOM
+            env_lines = _ENV_LINE_RE.findall(f.read())
     except FileNotFoundError:
         print("❌ Error: .env file not found")
         return False
     
+    if env_lines:
+        print('\n'.join(f"Loaded: {key} = {value}" for key, value in env_lines))
+    
     # Set environment variables
-    for key, value in env_vars.items():
-        os.environ[key] = value
+    os.environ.update({key: value.strip('"\'') for key, value in env_lines})
     
     return True
 
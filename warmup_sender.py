@@ -6,31 +6,29 @@ Warmup Sender Module - Handles sending warmup emails to improve deliverability
 import random
 from typing import List
 
-class WarmupSender:
-    def __init__(self):
-        # Warmup email addresses (various services to improve deliverability)
-        self.warmup_addresses = [
-            'test@gmail.com',
-            'warmup@outlook.com', 
-            'hello@yahoo.com',
-            'info@protonmail.com',
-            'contact@icloud.com',
-            'support@mail.com',
-            'admin@tutanota.com',
-            'noreply@zoho.com'
-        ]
-        
-        # Simple warmup subject lines
-        self.warmup_subjects = [
-            "System Test",
-            "Connection Check",
-            "Delivery Test",
-            "Mail System Verification",
-            "SMTP Test Message"
-        ]
-        
-        # Simple warmup body template
-        self.warmup_body = """<p>This is an automated system test email.</p>
+# Warmup email addresses (various services to improve deliverability)
+_WARMUP_ADDRESSES = (
+    'test@gmail.com',
+    'warmup@outlook.com', 
+    'hello@yahoo.com',
+    'info@protonmail.com',
+    'contact@icloud.com',
+    'support@mail.com',
+    'admin@tutanota.com',
+    'noreply@zoho.com'
+)
+
+# Simple warmup subject lines
+_WARMUP_SUBJECTS = (
+    "System Test",
+    "Connection Check",
+    "Delivery Test",
+    "Mail System Verification",
+    "SMTP Test Message"
+)
+
+# Simple warmup body template
+_WARMUP_BODY = """<p>This is an automated system test email.</p>
 
 <p>This message is sent to verify email delivery and maintain sender reputation.</p>
 
@@ -38,19 +36,38 @@ class WarmupSender:
 
 <p>Best regards,<br>
 Email System</p>"""
+
+class WarmupSender:
+    def __init__(self):
+        self._rng = random.Random()  # private PRNG, independent of the global random state
+        self._choice = self._rng.choice
+        
+        # Per-instance lists, so callers can still modify them
+        self.warmup_addresses = list(_WARMUP_ADDRESSES)
+        self.warmup_subjects = list(_WARMUP_SUBJECTS)
+        self.warmup_body = _WARMUP_BODY
     
     def get_random_warmup_email(self) -> str:
         """Get a random warmup email address"""
-        return random.choice(self.warmup_addresses)
+        return self._choice(self.warmup_addresses)
     
     def get_warmup_subject(self) -> str:
         """Get a random warmup subject line"""
-        return random.choice(self.warmup_subjects)
+        return self._choice(self.warmup_subjects)
     
     def get_warmup_body(self) -> str:
         """Get the warmup email body"""
         return self.warmup_body
     
+    def next_warmup_message(self) -> tuple:
+        """
+        Pick the next warmup email in one call
+        
+        Returns:
+            tuple: (to_email, subject, body)
+        """
+        return self._choice(self.warmup_addresses), self._choice(self.warmup_subjects), self.warmup_body
+    
     def get_warmup_addresses(self) -> List[str]:
         """Get all warmup email addresses"""
         return self.warmup_addresses.copy()